@@ -0,0 +1,168 @@
+"""Local stand-ins for the Wyoming Satellite used by the benchmark scripts.
+
+Nothing here needs the S330, a satellite or root; everything listens on
+127.0.0.1 with an ephemeral port.
+"""
+import json
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Make the service scripts in the repository root importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def format_latencies(name, seconds):
+    """One summary line (milliseconds) for a list of latencies in seconds."""
+    ms = [s * 1000 for s in seconds]
+    return (f"{name:<28} n={len(ms):<5} p50={percentile(ms, 50):7.3f} ms  "
+            f"p95={percentile(ms, 95):7.3f} ms  p99={percentile(ms, 99):7.3f} ms  max={max(ms, default=0):7.3f} ms")
+
+
+class FakeWyomingApi:
+    """Minimal Wyoming Satellite Web API (/api/status, /api/trigger-wake, /api/cancel)."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.active = False
+        self.received = []  # (monotonic time, method, path)
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body in one segment, otherwise Nagle + delayed ACK adds ~40 ms
+            wbufsize = 65536
+
+            def _reply(self, body):
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                api.received.append((time.monotonic(), "GET", self.path))
+                time.sleep(api.delay)
+                self._reply({"is_active": api.active, "state": "streaming" if api.active else "idle"})
+
+            def do_POST(self):
+                api.received.append((time.monotonic(), "POST", self.path))
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                time.sleep(api.delay)
+                if self.path.endswith("/trigger-wake"):
+                    api.active = True
+                elif self.path.endswith("/cancel"):
+                    api.active = False
+                self._reply({})
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/api"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeWyomingEventSink:
+    """TCP server that accepts Wyoming connections and records received event types."""
+
+    def __init__(self):
+        self.received = []  # (monotonic time, event type)
+        self._listener = socket.create_server(("127.0.0.1", 0))
+        self.uri = f"tcp://127.0.0.1:{self._listener.getsockname()[1]}"
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _addr = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn, conn.makefile("rb") as stream:
+            for line in stream:
+                header = json.loads(line)
+                # Data and payload are not needed, only skipped
+                stream.read((header.get("data_length") or 0) + (header.get("payload_length") or 0))
+                self.received.append((time.monotonic(), header["type"]))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._listener.close()
+
+
+# Stand-ins for Blinka's board and neopixel modules. show() blocks for the
+# WS2812B wire time (30 us per LED), like the real driver.
+FAKE_BOARD_SOURCE = """\
+def __getattr__(name):
+    return name
+"""
+
+FAKE_NEOPIXEL_SOURCE = """\
+import time
+
+RGB = "RGB"
+GRB = "GRB"
+
+
+class NeoPixel:
+    def __init__(self, pin, n, brightness=1.0, auto_write=True, pixel_order=GRB):
+        self.n = n
+        self.brightness = brightness
+        self.auto_write = auto_write
+        self.pixels = [(0, 0, 0)] * n
+        self.shows = 0
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, index, value):
+        self.pixels[index] = value
+
+    def __getitem__(self, index):
+        return self.pixels[index]
+
+    def fill(self, color):
+        self.pixels = [tuple(color)] * self.n
+
+    def show(self):
+        time.sleep(self.n * 30e-6)
+        self.shows += 1
+
+    def deinit(self):
+        pass
+"""
+
+
+def write_fake_blinka(directory):
+    """Write fake board/neopixel modules to directory (put it first on PYTHONPATH)."""
+    directory = Path(directory)
+    (directory / "board.py").write_text(FAKE_BOARD_SOURCE)
+    (directory / "neopixel.py").write_text(FAKE_NEOPIXEL_SOURCE)
+    return directory
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Replays HID traces through the button service against a fake Web API.
+
+Reports go through the same path as on the device (ButtonService, gesture
+engine, VolumeController, Web API client); only the S330 is replaced by a
+ReplayReader and the mixer by a NullMixer. Without --trace two synthetic
+traces are generated:
+
+- phone: single presses of the phone button, replayed in real time
+  (press-to-action latency)
+- burst: volume presses back to back without pauses (throughput and how
+  many mixer writes remain after coalescing)
+
+    python3 benchmarks/bench_button_pipeline.py --presses 50
+    python3 benchmarks/bench_button_pipeline.py --trace my_recording.jsonl --speed 1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+from _fakes import FakeWyomingApi
+import s330_buttons as buttons
+from service_metrics import Metrics
+
+STAGES = ("report_handling", "report_to_done_satellite", "api_status", "api_trigger-wake",
+          "api_cancel", "volume_press_to_write", "mixer_write")
+
+
+def write_trace(path, reports):
+    """reports: (seconds, bytes) as recorded by TraceRecorder."""
+    with open(path, "w", encoding="utf-8") as f:
+        for offset, data in reports:
+            f.write(json.dumps({"t": offset, "data": data.hex()}) + "\n")
+
+
+def phone_trace(presses, interval):
+    reports = []
+    for i in range(presses):
+        reports.append((i * interval, bytes([2, 0x03])))
+        reports.append((i * interval + 0.08, bytes([2, 0x00])))
+    return reports
+
+
+def burst_trace(presses):
+    reports = []
+    for _ in range(presses):
+        reports.append((0.0, bytes([1, 0x08])))
+        reports.append((0.0, bytes([1, 0x00])))
+    return reports
+
+
+async def replay(path, speed, api, mixer_delay):
+    buttons.WYOMING_API_BASE_URL = api.base_url
+    buttons._api_client = None
+    buttons.metrics = Metrics("s330_buttons")
+    mixer = buttons.NullMixer(delay=mixer_delay)
+
+    reader = buttons.ReplayReader(path, speed)
+    service = buttons.ButtonService(reader, mixer)
+    reader.on_finished = service.stop_when_idle
+
+    start = time.perf_counter()
+    await service.run()
+    elapsed = time.perf_counter() - start
+    buttons.get_api_client().close()
+    return service, mixer, elapsed
+
+
+def report(name, service, mixer, elapsed):
+    print(f"{name}: {service.reports} reports in {elapsed:.3f} s ({service.reports / elapsed:,.0f} reports/s), "
+          f"{service.volume.presses if service.volume else 0} volume steps -> {mixer.writes} mixer writes")
+    for stage in STAGES:
+        histogram = buttons.metrics.histograms.get(stage)
+        if histogram is not None:
+            p50, p95, p99 = histogram.quantiles()
+            print(f"  {stage:<26} n={histogram.count:<5} p50={p50 * 1000:7.3f} ms  p95={p95 * 1000:7.3f} ms  "
+                  f"p99={p99 * 1000:7.3f} ms  max={histogram.max * 1000:7.3f} ms")
+
+
+async def run(args):
+    with FakeWyomingApi(delay=args.api_delay) as api, tempfile.TemporaryDirectory() as tmp:
+        if args.trace:
+            traces = [("trace", args.trace, args.speed)]
+        else:
+            phone = os.path.join(tmp, "phone.jsonl")
+            burst = os.path.join(tmp, "burst.jsonl")
+            write_trace(phone, phone_trace(args.presses, args.interval))
+            write_trace(burst, burst_trace(args.presses * 10))
+            traces = [("phone", phone, 1.0), ("burst", burst, 0.0)]
+
+        for name, path, speed in traces:
+            service, mixer, elapsed = await replay(path, speed, api, args.mixer_delay)
+            report(name, service, mixer, elapsed)
+        print(f"fake API received {len(api.received)} requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace", help="Replay this --record file instead of the synthetic traces")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed for --trace (default: 1.0, 0 = no pauses)")
+    parser.add_argument("--presses", type=int, default=20, help="Phone presses in the synthetic trace (default: 20)")
+    parser.add_argument("--interval", type=float, default=0.25, help="Seconds between phone presses (default: 0.25)")
+    parser.add_argument("--api-delay", type=float, default=0.0, help="Simulated Web API latency in seconds")
+    parser.add_argument("--mixer-delay", type=float, default=0.002, help="Simulated mixer write time in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Memory and startup time: two service processes vs. voice_mini.py.
+
+Starts the button and LED services as they run on the device: first as two
+processes (connected through --state-uri), then as one voice_mini.py process.
+The S330 is replaced by a --replay of a trace that waits an hour before its
+first press, and Blinka by the fake board/neopixel modules. For each layout
+it reports:
+
+- startup: from spawning the processes until the LED server accepts
+  connections and the button service logs "Monitoring for button presses"
+- RSS and PSS (from /proc/<pid>/smaps_rollup; PSS splits shared pages
+  between processes, so it is the fairer sum) after a short settle time
+
+    python3 benchmarks/bench_combined.py --runs 5
+"""
+import argparse
+import json
+import os
+import re
+import shlex
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from _fakes import write_fake_blinka
+
+REPO = Path(__file__).resolve().parent.parent
+READY_LINE = "Monitoring for button presses"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def memory_kib(pid):
+    """(RSS, PSS) in KiB."""
+    with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as f:
+        text = f.read()
+    return tuple(int(re.search(rf"^{field}:\s+(\d+)", text, re.MULTILINE).group(1)) for field in ("Rss", "Pss"))
+
+
+def port_open(port):
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+            return True
+    except OSError:
+        return False
+
+
+class Service:
+    """Subprocess whose stderr is watched for the button service's ready line."""
+
+    def __init__(self, cmd, env):
+        self.proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        self.ready = threading.Event()
+        self.output = []
+        threading.Thread(target=self._watch, daemon=True).start()
+
+    def _watch(self):
+        for line in self.proc.stderr:
+            self.output.append(line)
+            if READY_LINE in line:
+                self.ready.set()
+
+    def stop(self):
+        if self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGTERM)
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+
+
+def output(services):
+    return "".join(line for service in services for line in service.output)
+
+
+def measure(commands, led_port, env, settle, timeout=30.0):
+    start = time.monotonic()
+    services = [Service(cmd, env) for cmd in commands]
+    try:
+        deadline = start + timeout
+        led_ready = None
+        while time.monotonic() < deadline:
+            if led_ready is None and port_open(led_port):
+                led_ready = time.monotonic()
+            if led_ready is not None and any(service.ready.is_set() for service in services):
+                break
+            if any(service.proc.poll() is not None for service in services):
+                raise RuntimeError("service exited:\n" + output(services))
+            time.sleep(0.005)
+        else:
+            raise RuntimeError("services did not become ready:\n" + output(services))
+        startup = time.monotonic() - start
+        time.sleep(settle)
+        rss = pss = 0
+        for service in services:
+            service_rss, service_pss = memory_kib(service.proc.pid)
+            rss += service_rss
+            pss += service_pss
+        return startup, rss, pss
+    finally:
+        for service in services:
+            service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Measurements per layout (default: 3)")
+    parser.add_argument("--settle", type=float, default=1.0, help="Seconds to wait before reading memory (default: 1)")
+    parser.add_argument("--num-leds", type=int, default=12, help="LEDs of the fake strip (default: 12)")
+    args = parser.parse_args()
+
+    python = sys.executable
+    with tempfile.TemporaryDirectory() as tmp:
+        write_fake_blinka(tmp)
+        trace = os.path.join(tmp, "idle.jsonl")
+        with open(trace, "w", encoding="utf-8") as f:
+            # First report right away (ignored release), the next one only after an hour
+            f.write(json.dumps({"t": 0.0, "data": "0200"}) + "\n")
+            f.write(json.dumps({"t": 3600.0, "data": "0203"}) + "\n")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [tmp, os.environ.get("PYTHONPATH")])))
+
+        results = {"separate": [], "combined": []}
+        for _ in range(args.runs):
+            led_port, state_port = free_port(), free_port()
+            led_args = ["--uri", f"tcp://127.0.0.1:{led_port}", "--num-leds", str(args.num_leds)]
+            button_args = ["--replay", trace, "--mixer-backend", "null", "--no-cache", "--no-satellite-discovery"]
+            separate = [
+                [python, str(REPO / "neopixel_led_service.py"), *led_args, "--state-uri", f"tcp://127.0.0.1:{state_port}"],
+                [python, str(REPO / "s330_buttons.py"), *button_args, "--state-uri", f"tcp://127.0.0.1:{state_port}"],
+            ]
+            combined = [[python, str(REPO / "voice_mini.py"), "--leds", shlex.join(led_args),
+                         "--buttons", shlex.join(button_args)]]
+            results["separate"].append(measure(separate, led_port, env, args.settle))
+            results["combined"].append(measure(combined, led_port, env, args.settle))
+
+    print(f"{args.runs} runs each, medians")
+    for layout, samples in results.items():
+        startup, rss, pss = (statistics.median(values) for values in zip(*samples))
+        print(f"{layout:<9} startup {startup * 1000:6.0f} ms   RSS {rss / 1024:6.1f} MiB   PSS {pss / 1024:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
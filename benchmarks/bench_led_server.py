@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Load generator for the LED service's Wyoming event server.
+
+Starts neopixel_led_service.py as a subprocess with fake board/neopixel
+modules, connects N clients and sends voice sessions (detection,
+streaming-started, audio chunks, transcript, streaming-stopped). Audio chunks
+are paced like a real satellite (1024 samples at 16 kHz, 15.6 chunks/s) unless
+--rate says otherwise; the other events are sent as they come. The default
+session is about 4 s long, so the listening animation (or --vu-meter) is
+shown after the 1 s detection overlay. The numbers come from the service's
+own metrics endpoint and from /proc:
+
+- events/s handled by the server (sent vs. handled)
+- handler latency and event-to-photon latency (p50/p95/p99)
+- frames shown per second
+- resident memory: baseline, per idle connection, after the load
+
+    python3 benchmarks/bench_led_server.py --clients 4 --duration 10
+    python3 benchmarks/bench_led_server.py --clients 1 --server-args="--vu-meter"
+    python3 benchmarks/bench_led_server.py --clients 4 --rate 0   # stress: no pacing
+"""
+import argparse
+import asyncio
+import math
+import os
+import re
+import shlex
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+from _fakes import write_fake_blinka
+
+from wyoming.event import Event, async_write_event
+
+REPO = Path(__file__).resolve().parent.parent
+SAMPLES_PER_CHUNK = 1024
+AUDIO_FORMAT = {"rate": 16000, "width": 2, "channels": 1}
+CHUNK_RATE = AUDIO_FORMAT["rate"] / SAMPLES_PER_CHUNK
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_kib(pid):
+    with open(f"/proc/{pid}/status", encoding="ascii") as f:
+        return int(re.search(r"VmRSS:\s+(\d+)", f.read()).group(1))
+
+
+def scrape(port):
+    """Prometheus text -> {'name{labels}': value}."""
+    text = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=2).read().decode()
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            key, _, value = line.rpartition(" ")
+            values[key] = float(value)
+    return values
+
+
+def quantiles(values, stage):
+    return [values.get(f'neopixel_led_latency_quantile_seconds{{stage="{stage}",quantile="{q}"}}', 0.0)
+            for q in ("0.5", "0.95", "0.99")]
+
+
+def tone(amplitude, frequency=440.0):
+    """One chunk of a sine tone (S16_LE), so that --vu-meter has something to show."""
+    rate = AUDIO_FORMAT["rate"]
+    samples = (int(amplitude * math.sin(2 * math.pi * frequency * i / rate)) for i in range(SAMPLES_PER_CHUNK))
+    return struct.pack(f"<{SAMPLES_PER_CHUNK}h", *samples)
+
+
+AUDIO_CHUNKS = [Event("audio-chunk", AUDIO_FORMAT, tone(amplitude)) for amplitude in (500, 4000, 16000, 4000)]
+
+
+def session(chunks):
+    """Events of one voice session as the satellite sends them."""
+    yield Event("detection", {"name": "ok_nabu"})
+    yield Event("streaming-started")
+    yield Event("voice-started")
+    for i in range(chunks):
+        yield AUDIO_CHUNKS[i % len(AUDIO_CHUNKS)]
+    yield Event("transcript", {"text": "turn on the lights"})
+    yield Event("streaming-stopped")
+
+
+async def client(port, rate, chunks, stop_at, sent):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    interval = 1.0 / rate if rate > 0 else 0.0
+    next_send = time.monotonic()
+    try:
+        while time.monotonic() < stop_at:
+            for event in session(chunks):
+                await async_write_event(event, writer)
+                sent[0] += 1
+                if interval:
+                    if event.type != "audio-chunk":
+                        continue
+                    next_send += interval
+                    delay = next_send - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif sent[0] % 64 == 0:
+                    await asyncio.sleep(0)
+                if time.monotonic() >= stop_at:
+                    break
+    finally:
+        writer.close()
+    return reader
+
+
+async def wait_for_port(port, proc, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"LED service exited with {proc.returncode}")
+        try:
+            _reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"LED service did not listen on port {port}")
+
+
+async def run(args, proc, event_port, metrics_port):
+    await wait_for_port(event_port, proc)
+    await wait_for_port(metrics_port, proc)
+    await asyncio.sleep(0.5)
+    rss_base = rss_kib(proc.pid)
+
+    # Idle connections first: memory per connection
+    idle = [await asyncio.open_connection("127.0.0.1", event_port) for _ in range(args.clients)]
+    await asyncio.sleep(0.5)
+    rss_connected = rss_kib(proc.pid)
+    for _reader, writer in idle:
+        writer.close()
+
+    before = scrape(metrics_port)
+    sent = [0]
+    start = time.monotonic()
+    stop_at = start + args.duration
+    await asyncio.gather(*(client(event_port, args.rate, args.chunks, stop_at, sent) for _ in range(args.clients)))
+    elapsed = time.monotonic() - start
+    # Let the server work off what is still buffered
+    await asyncio.sleep(0.5)
+    after = scrape(metrics_port)
+    rss_loaded = rss_kib(proc.pid)
+
+    handled = after.get("neopixel_led_events_total", 0) - before.get("neopixel_led_events_total", 0)
+    frames = after.get("neopixel_led_frames_total", 0) - before.get("neopixel_led_frames_total", 0)
+    pacing = "unpaced" if args.rate <= 0 else f"{args.rate:g} chunks/s, {args.chunks / args.rate:.1f} s sessions"
+    print(f"{args.clients} clients, {effective_num_leds(args)} LEDs, {elapsed:.1f} s, {pacing}")
+    print(f"events:  sent {sent[0] / elapsed:,.0f}/s, handled {handled / elapsed:,.0f}/s "
+          f"({after.get('neopixel_led_dropped_total', 0):,.0f} dropped early, "
+          f"{after.get('neopixel_led_coalesced_total', 0):,.0f} coalesced)")
+    for stage in ("event_handling", "event_to_photon", "show", "frame"):
+        p50, p95, p99 = quantiles(after, stage)
+        print(f"{stage:<16} p50={p50 * 1000:7.3f} ms  p95={p95 * 1000:7.3f} ms  p99={p99 * 1000:7.3f} ms")
+    print(f"render:  {frames / elapsed:.1f} frames/s shown, "
+          f"{after.get('neopixel_led_late_frames_total', 0):,.0f} late, "
+          f"{after.get('neopixel_led_missed_frames_total', 0):,.0f} missed")
+    print(f"memory:  {rss_base / 1024:.1f} MiB at start, "
+          f"{(rss_connected - rss_base) / max(1, args.clients):+.1f} KiB per idle connection, "
+          f"{rss_loaded / 1024:.1f} MiB after the load")
+
+
+def effective_num_leds(args):
+    """LED count the service really uses (--server-args may override --num-leds)."""
+    override = argparse.ArgumentParser(add_help=False)
+    override.add_argument("--num-leds", type=int)
+    parsed, _unknown = override.parse_known_args(shlex.split(args.server_args))
+    return args.num_leds if parsed.num_leds is None else parsed.num_leds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1, help="Concurrent Wyoming clients (default: 1)")
+    parser.add_argument("--rate", type=float, default=CHUNK_RATE,
+                        help=f"Audio chunks per second per client (default: {CHUNK_RATE:g}, "
+                             "as the satellite sends them; 0 = as fast as possible)")
+    parser.add_argument("--chunks", type=int, default=64,
+                        help="Audio chunks per voice session (default: 64, about 4 s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load (default: 10)")
+    parser.add_argument("--num-leds", type=int, default=12, help="LEDs of the fake strip (default: 12)")
+    parser.add_argument("--server-args", default="", help="Extra arguments for neopixel_led_service.py")
+    args = parser.parse_args()
+
+    event_port = free_port()
+    metrics_port = free_port()
+    with tempfile.TemporaryDirectory() as fake_dir:
+        write_fake_blinka(fake_dir)
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [fake_dir, os.environ.get("PYTHONPATH")])))
+        cmd = [sys.executable, str(REPO / "neopixel_led_service.py"),
+               "--uri", f"tcp://127.0.0.1:{event_port}", "--num-leds", str(args.num_leds),
+               "--metrics-port", str(metrics_port), *shlex.split(args.server_args)]
+        proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        try:
+            asyncio.run(run(args, proc, event_port, metrics_port))
+        finally:
+            proc.send_signal(signal.SIGINT)
+            try:
+                _out, err = proc.communicate(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                _out, err = proc.communicate()
+            if proc.returncode not in (0, -signal.SIGINT, 1):
+                print(err, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Benchmarks the WS2812B SPI encoder and output against a fake spidev file.
+
+No SPI hardware is needed: the frames are written to a temporary file, the
+ioctl configuration is skipped with a warning.
+
+    python3 benchmarks/bench_spi_encoder.py --num-leds 300 --frames 2000
+"""
+import argparse
+import logging
+import tempfile
+import time
+
+import numpy as np
+
+import _fakes  # noqa: F401 (makes the service scripts importable)
+import neopixel_led_service as leds
+
+
+def decode(buffer):
+    """Turn an SPI transfer back into color bytes (to check the encoder)."""
+    bits = np.unpackbits(np.asarray(buffer[1 : len(buffer) - leds.WS2812_SPI_RESET_BYTES], dtype=np.uint8))
+    nibbles = bits.reshape(-1, 4)
+    assert np.all((nibbles[:, 0] == 1) & (nibbles[:, 3] == 0)), "invalid WS2812 bit pattern"
+    return np.packbits(nibbles[:, 1]).tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-leds", type=int, default=300, help="LEDs per frame (default: 300)")
+    parser.add_argument("--frames", type=int, default=2000, help="Frames to encode (default: 2000)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    rng = np.random.default_rng(1)
+    frames = rng.integers(0, 256, size=(16, args.num_leds, 3), dtype=np.uint8)
+
+    # Correctness first: every possible byte value must survive a round trip
+    all_values = np.arange(256, dtype=np.uint8)
+    assert decode(leds.encode_ws2812_spi(all_values)) == all_values.tobytes()
+
+    buffer = leds.ws2812_spi_buffer(args.num_leds * 3)
+    start = time.perf_counter()
+    for i in range(args.frames):
+        leds.encode_ws2812_spi(frames[i % len(frames)], out=buffer)
+    encode_time = (time.perf_counter() - start) / args.frames
+
+    with tempfile.NamedTemporaryFile() as fake_spidev:
+        pixels = leds.SpiPixels(fake_spidev.name, args.num_leds)
+        start = time.perf_counter()
+        for i in range(args.frames):
+            pixels.write_frame(frames[i % len(frames)])
+            pixels.show()
+        show_time = (time.perf_counter() - start) / args.frames
+        pixels.deinit()
+
+    frame_bytes = len(buffer)
+    print(f"{args.num_leds} LEDs, {frame_bytes} bytes per SPI transfer "
+          f"({frame_bytes * 8 / leds.WS2812_SPI_SPEED_HZ * 1000:.2f} ms on the wire)")
+    print(f"encode only:          {encode_time * 1e6:8.1f} us/frame")
+    print(f"reorder+encode+write: {show_time * 1e6:8.1f} us/frame ({1 / show_time:,.0f} fps)")
+
+
+if __name__ == "__main__":
+    main()
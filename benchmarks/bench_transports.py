@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Compares wake trigger latency: Web API (HTTP keep-alive) vs. direct Wyoming socket.
+
+Both transports talk to local fakes, so the numbers show the client side
+overhead of each path (serialization, HTTP round trip, syscalls):
+
+    python3 benchmarks/bench_transports.py --count 500
+"""
+import argparse
+import time
+
+from _fakes import FakeWyomingApi, FakeWyomingEventSink, format_latencies
+
+import s330_buttons
+
+
+def wait_for(received, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while len(received) < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200, help="Triggers per transport (default: 200)")
+    args = parser.parse_args()
+
+    with FakeWyomingApi() as api, FakeWyomingEventSink() as sink:
+        http_client = s330_buttons.WyomingApiClient(api.base_url)
+        wyoming_client = s330_buttons.WyomingControlClient(sink.uri)
+
+        # Open both connections first, so that only the keep-alive case is measured
+        http_client.trigger_wake()
+        wyoming_client.trigger_wake()
+        wait_for(sink.received, 1)
+        api.received.clear()
+        sink.received.clear()
+
+        http_calls, http_delivery = [], []
+        for _ in range(args.count):
+            start = time.monotonic()
+            http_client.trigger_wake()
+            http_calls.append(time.monotonic() - start)
+            http_delivery.append(api.received[-1][0] - start)
+
+        wyoming_calls, wyoming_delivery = [], []
+        for i in range(args.count):
+            start = time.monotonic()
+            wyoming_client.trigger_wake()
+            wyoming_calls.append(time.monotonic() - start)
+            wait_for(sink.received, i + 1)
+            wyoming_delivery.append(sink.received[i][0] - start)
+
+        http_client.close()
+        wyoming_client.close()
+
+    print(format_latencies("HTTP API call", http_calls))
+    print(format_latencies("HTTP API delivery", http_delivery))
+    print(format_latencies("Wyoming socket call", wyoming_calls))
+    print(format_latencies("Wyoming socket delivery", wyoming_delivery))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Benchmarks the VU meter: level measurement per audio chunk and rendering.
+
+Prints the cost per chunk/frame and the resulting share of one CPU core at the
+satellite's chunk rate and the LED frame rate.
+
+    python3 benchmarks/bench_vu_meter.py --samples-per-chunk 1024 --num-leds 12
+"""
+import argparse
+import time
+
+import numpy as np
+
+import _fakes  # noqa: F401 (makes the service scripts importable)
+import neopixel_led_service as leds
+
+
+def measure(func, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=int, default=16000, help="Sample rate in Hz (default: 16000)")
+    parser.add_argument("--samples-per-chunk", type=int, default=1024, help="Samples per audio chunk (default: 1024)")
+    parser.add_argument("--num-leds", type=int, default=12, help="LEDs in the meter (default: 12)")
+    parser.add_argument("--fps", type=float, default=30.0, help="LED frame rate (default: 30)")
+    parser.add_argument("--count", type=int, default=20000, help="Iterations per measurement (default: 20000)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    t = np.arange(args.samples_per_chunk) / args.rate
+    signal = 8000 * np.sin(2 * np.pi * 440 * t) + rng.normal(0, 500, args.samples_per_chunk)
+    chunk = signal.astype("<i2").tobytes()
+
+    meter = leds.VuMeter()
+    meter.update(chunk)
+    assert 0.0 < meter.level <= 1.0 and meter.peak >= meter.level
+
+    frame = np.zeros((args.num_leds, 3), dtype=np.float32)
+    update_time = measure(lambda: meter.update(chunk), args.count)
+    render_time = measure(lambda: meter.render(frame, 0.0), args.count)
+
+    # Reference: full-rate float64 RMS on every sample
+    def full_rate():
+        values = np.frombuffer(chunk, dtype="<i2").astype(np.float64)
+        return np.sqrt(np.mean(values ** 2)), np.abs(values).max()
+
+    full_time = measure(full_rate, args.count)
+
+    chunk_rate = args.rate / args.samples_per_chunk
+    print(f"{args.samples_per_chunk} samples per chunk ({chunk_rate:.1f} chunks/s), "
+          f"{args.num_leds} LEDs at {args.fps:g} fps")
+    print(f"update (decimated 1/{leds.VU_DECIMATION}): {update_time * 1e6:8.1f} us/chunk "
+          f"-> {update_time * chunk_rate * 100:.3f} % CPU")
+    print(f"full-rate float64 RMS:    {full_time * 1e6:8.1f} us/chunk "
+          f"-> {full_time * chunk_rate * 100:.3f} % CPU")
+    print(f"render:                   {render_time * 1e6:8.1f} us/frame "
+          f"-> {render_time * args.fps * 100:.3f} % CPU")
+    total = update_time * chunk_rate + render_time * args.fps
+    print(f"meter total:              {total * 100:.3f} % of one core")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,20 @@
 """Controls a WS2812B LED strip for Wyoming events."""
 import argparse
 import asyncio
+import fcntl
 import logging
+import math
+import os
+import signal
+import struct
 import time
+from collections import Counter
 from functools import partial
-from typing import Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
-import board
-import neopixel
+import numpy as np
 from wyoming.asr import Transcript
+from wyoming.audio import AudioChunk
 from wyoming.event import Event
 from wyoming.satellite import (
     RunSatellite,
@@ -20,6 +26,9 @@ from wyoming.server import AsyncEventHandler, AsyncServer
 from wyoming.vad import VoiceStarted
 from wyoming.wake import Detection
 
+import service_logging
+from service_metrics import NULL_METRICS, Metrics, start_reporting, stop_reporting
+
 # Define these constants to maintain compatibility with the code
 class SatelliteConnected:
     """Satellite connected event (compatibility class)."""
@@ -36,14 +45,26 @@ class SatelliteDisconnected:
 _LOGGER = logging.getLogger()
 
 # WS2812B LED strip configuration
-LED_ORDER = neopixel.GRB  # Most WS2812B LEDs use GRB color order
+LED_ORDER = "GRB"  # Most WS2812B LEDs use GRB color order (neopixel.GRB)
 # Default values will be overridden by command line arguments
 
-async def main() -> None:
-    """Main entry point."""
+# SPI output: every WS2812B bit is sent as 4 SPI bits at 3.2 MHz (1 -> 1110,
+# 0 -> 1000, i.e. 0.94/0.31 us high time), followed by >280 us of low level
+# to latch the colors.
+WS2812_SPI_SPEED_HZ = 3_200_000
+WS2812_SPI_RESET_BYTES = 120
+
+# spidev ioctls (linux/spi/spidev.h)
+_SPI_IOC_WR_MODE = 0x40016B01
+_SPI_IOC_WR_BITS_PER_WORD = 0x40016B03
+_SPI_IOC_WR_MAX_SPEED_HZ = 0x40046B04
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command line of the LED service (also parsed for voice_mini.py --leds)."""
     parser = argparse.ArgumentParser()
     parser.add_argument("--uri", required=True, help="unix:// or tcp://")
     parser.add_argument("--debug", action="store_true", help="Log DEBUG messages")
+    parser.add_argument("--log-file", help="Also write the log to this file (in batches, every few seconds)")
     parser.add_argument(
         "--led-brightness",
         type=float,
@@ -62,34 +83,167 @@ async def main() -> None:
         default=18,
         help="GPIO pin number for the LED strip (default: 18, which is D18)",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--led-backend",
+        choices=["neopixel", "spi"],
+        default="neopixel",
+        help="Drive the strip via GPIO PWM/DMA (neopixel, needs root) or SPI MOSI (spi)",
+    )
+    parser.add_argument(
+        "--spi-device",
+        default="/dev/spidev0.0",
+        help="spidev device for --led-backend spi (default: /dev/spidev0.0, data on GPIO10)",
+    )
+    parser.add_argument(
+        "--fps",
+        type=float,
+        default=30.0,
+        help="Frame rate of LED animations (default: 30)",
+    )
+    parser.add_argument(
+        "--gamma",
+        type=float,
+        default=1.0,
+        help="Gamma correction applied to every frame (default: 1.0 = off, 2.2 for perceptually even fades)",
+    )
+    parser.add_argument(
+        "--effect",
+        choices=sorted(LISTENING_EFFECTS),
+        default="solid",
+        help="LED effect while the satellite is listening (default: solid)",
+    )
+    parser.add_argument(
+        "--vu-meter",
+        action="store_true",
+        help="Show the microphone level (from audio-chunk events) instead of --effect while listening",
+    )
+    parser.add_argument(
+        "--zone",
+        action="append",
+        type=parse_zone,
+        default=[],
+        metavar="CLIENT=START-END[:PRIORITY]",
+        help="LEDs used by the satellite connecting from host CLIENT ('local' for unix sockets, "
+        "'default' for all others); may be repeated",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve render and event-to-photon timing in Prometheus text format on http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        help="Log a timing summary (p50/p95/p99) every N seconds",
+    )
+    parser.add_argument(
+        "--state-uri",
+        help="unix:// or tcp:// URI to publish satellite state events on (used by s330_buttons.py)",
+    )
+    service_logging.add_arguments(parser)
+    return parser
+
+
+async def main() -> None:
+    """Main entry point."""
+    args = build_parser().parse_args()
+
+    # Console and --log-file are written by a background thread; per-event
+    # messages are formatted there, and only if they are output or dumped
+    log_pipeline = service_logging.setup_logging(
+        logging.DEBUG if args.debug else logging.INFO,
+        logging.Formatter(logging.BASIC_FORMAT),
+        args.log_file,
+        args.log_buffer,
+        args.log_dump_file,
+        capture_debug=args.log_buffer_debug,
+    )
+    log_pipeline.install_dump_signal(asyncio.get_running_loop())
+    await run(args)
+
 
-    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+async def run(args: argparse.Namespace, publisher: Optional["StatePublisher"] = None) -> None:
+    """Drive the LEDs and serve Wyoming events until cancelled.
+
+    publisher: shared StatePublisher when running in one process with the
+    button service (voice_mini.py); a new one is created otherwise.
+    """
     _LOGGER.debug(args)
 
     _LOGGER.info("Ready")
 
-    # Initialize the NeoPixel LED strip
-    # Convert pin number to board pin
-    led_pin = getattr(board, f"D{args.pin}")
-    _LOGGER.info(f"Initializing {args.num_leds} LEDs on pin D{args.pin}")
-    
-    pixels = neopixel.NeoPixel(
-        led_pin, 
-        args.num_leds, 
-        brightness=args.led_brightness, 
-        auto_write=False,
-        pixel_order=LED_ORDER
+    if args.led_backend == "spi":
+        _LOGGER.info(f"Initializing {args.num_leds} LEDs on {args.spi_device}")
+        pixels = SpiPixels(args.spi_device, args.num_leds, pixel_order=LED_ORDER)
+    else:
+        # Blinka is only needed (and imported) for the GPIO backend
+        import board
+        import neopixel
+
+        # Initialize the NeoPixel LED strip
+        # Convert pin number to board pin
+        led_pin = getattr(board, f"D{args.pin}")
+        _LOGGER.info(f"Initializing {args.num_leds} LEDs on pin D{args.pin}")
+        
+        # Brightness is applied by the animator, so frames can be copied to the
+        # pixel buffer without per-pixel scaling
+        pixels = neopixel.NeoPixel(
+            led_pin, 
+            args.num_leds, 
+            brightness=1.0, 
+            auto_write=False,
+            pixel_order=LED_ORDER
+        )
+
+    metrics: Any = NULL_METRICS
+    metrics_handles: List[asyncio.Future] = []
+    if args.metrics_port or args.metrics_interval:
+        metrics = Metrics("neopixel_led")
+        metrics_handles = await start_reporting(metrics, args.metrics_port, args.metrics_interval, _LOGGER)
+
+    animator = LedAnimator(
+        pixels,
+        fps=args.fps,
+        brightness=args.led_brightness,
+        gamma=args.gamma,
+        zones=dict(args.zone),
+        metrics=metrics,
     )
+    animator.start()
+
+    def dump_stats() -> None:
+        animator.log_stats()
+        if metrics.enabled:
+            _LOGGER.info("Metrics: %s", metrics.summary())
+
+    # kill -USR1 <pid> logs the current numbers
+    asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, dump_stats)
 
     # Start server
     server = AsyncServer.from_uri(args.uri)
+    if publisher is None:
+        publisher = StatePublisher()
+
+    # Only the event server runs (and handles SIGTERM): every AsyncServer.run() installs its
+    # own SIGTERM handler, so a second run() would take the signal away from the event server.
+    state_server = None
+    if args.state_uri:
+        _LOGGER.info("Publishing satellite state on %s", args.state_uri)
+        state_server = AsyncServer.from_uri(args.state_uri)
 
     try:
-        await server.run(partial(LEDsEventHandler, args, pixels))
+        if state_server is not None:
+            await state_server.start(partial(StateSubscriberHandler, publisher))
+        await server.run(partial(LEDsEventHandler, args, animator, publisher=publisher))
     except KeyboardInterrupt:
         pass
     finally:
+        if state_server is not None:
+            await state_server.stop()
+        await animator.stop()
+        await stop_reporting(metrics_handles)
+        dump_stats()
+
         # Turn off LEDs
         pixels.fill((0, 0, 0))
         pixels.show()
@@ -105,57 +259,892 @@ _BLUE = (0, 0, 255)
 _GREEN = (0, 255, 0)
 
 
+Color = Tuple[int, int, int]
+
+# Animation priorities (a temporary animation only replaces one with lower or equal priority)
+PRIORITY_STATE = 0
+PRIORITY_NOTIFY = 1
+PRIORITY_RESULT = 2
+
+# Seconds the LEDs take to fade out when the satellite returns to idle
+IDLE_FADE_TIME = 0.5
+
+
+class Animation:
+    """Base class for LED animations.
+
+    An animation is rendered from the time elapsed since it started. Animations
+    with a duration are temporary and are shown on top of the current state.
+    """
+
+    static = False
+
+    def __init__(self, priority: int = PRIORITY_STATE, duration: Optional[float] = None) -> None:
+        self.priority = priority
+        self.duration = duration
+
+    def color_at(self, elapsed: float) -> Color:
+        raise NotImplementedError()
+
+    def render(self, frame: np.ndarray, elapsed: float) -> None:
+        """Render into the frame buffer (num_leds x 3, RGB 0-255)."""
+        frame[:] = self.color_at(elapsed)
+
+    def is_done(self, elapsed: float) -> bool:
+        return (self.duration is not None) and (elapsed >= self.duration)
+
+
+class Solid(Animation):
+    """Constant color (a state, unless a duration is given)."""
+
+    static = True
+
+    def __init__(self, color: Color, priority: int = PRIORITY_STATE, duration: Optional[float] = None) -> None:
+        super().__init__(priority, duration)
+        self.color = color
+
+    def color_at(self, elapsed: float) -> Color:
+        return self.color
+
+
+class Hold(Solid):
+    """Show a color for some time, then return to the current state."""
+
+    def __init__(self, color: Color, duration: float, priority: int = PRIORITY_RESULT) -> None:
+        super().__init__(color, priority=priority, duration=duration)
+
+
+class Flash(Animation):
+    """Blink a color on and off."""
+
+    def __init__(
+        self,
+        color: Color,
+        count: int = 3,
+        period: float = 0.6,
+        priority: int = PRIORITY_NOTIFY,
+    ) -> None:
+        super().__init__(priority, count * period)
+        self.color = color
+        self.period = period
+
+    def color_at(self, elapsed: float) -> Color:
+        return self.color if (elapsed % self.period) < (self.period / 2) else _BLACK
+
+
+class Fade(Animation):
+    """Linear transition between two colors, then hold the target color.
+
+    As a state, a finished fade is replaced by a Solid of the target color, so
+    the render loop stops animating (see LedLayer.render).
+    """
+
+    def __init__(
+        self,
+        start: Color,
+        end: Color,
+        fade_time: float = 0.5,
+        priority: int = PRIORITY_STATE,
+        duration: Optional[float] = None,
+    ) -> None:
+        super().__init__(priority, duration)
+        self.start = start
+        self.end = end
+        self.fade_time = fade_time
+
+    def color_at(self, elapsed: float) -> Color:
+        ratio = min(1.0, max(0.0, elapsed / self.fade_time)) if self.fade_time > 0 else 1.0
+        return _mix(self.start, self.end, ratio)
+
+
+class Pulse(Animation):
+    """Smoothly breathing color."""
+
+    def __init__(
+        self,
+        color: Color,
+        period: float = 2.0,
+        min_level: float = 0.1,
+        priority: int = PRIORITY_STATE,
+        duration: Optional[float] = None,
+    ) -> None:
+        super().__init__(priority, duration)
+        self.color = color
+        self.period = period
+        self.min_level = min_level
+
+    def color_at(self, elapsed: float) -> Color:
+        wave = (1 - math.cos(2 * math.pi * elapsed / self.period)) / 2
+        return _mix(_BLACK, self.color, self.min_level + (1 - self.min_level) * wave)
+
+
+def _mix(start: Color, end: Color, ratio: float) -> Color:
+    return tuple(round(a + (b - a) * ratio) for a, b in zip(start, end))  # type: ignore[return-value]
+
+
+class Gradient(Animation):
+    """Static gradient along the strip."""
+
+    static = True
+
+    def __init__(self, start: Color, end: Color, priority: int = PRIORITY_STATE) -> None:
+        super().__init__(priority)
+        self.start = np.array(start, dtype=np.float32)
+        self.end = np.array(end, dtype=np.float32)
+
+    def render(self, frame: np.ndarray, elapsed: float) -> None:
+        ratio = np.linspace(0.0, 1.0, len(frame), dtype=np.float32)[:, None]
+        frame[:] = self.start + (self.end - self.start) * ratio
+
+
+class Chase(Animation):
+    """Bright spot with a soft tail running along the strip."""
+
+    def __init__(
+        self,
+        color: Color,
+        speed: float = 20.0,
+        width: float = 4.0,
+        background: Color = _BLACK,
+        priority: int = PRIORITY_STATE,
+        duration: Optional[float] = None,
+    ) -> None:
+        super().__init__(priority, duration)
+        self.color = np.array(color, dtype=np.float32)
+        self.background = np.array(background, dtype=np.float32)
+        self.speed = speed  # LEDs per second
+        self.width = width
+
+    def render(self, frame: np.ndarray, elapsed: float) -> None:
+        num_leds = len(frame)
+        head = (elapsed * self.speed) % num_leds
+        # Distance behind the head, wrapping around the end of the strip
+        distance = (head - np.arange(num_leds, dtype=np.float32)) % num_leds
+        level = np.clip(1.0 - distance / self.width, 0.0, 1.0)[:, None]
+        frame[:] = self.background + (self.color - self.background) * level
+
+
+# VU meter: levels are measured on every VU_DECIMATION-th sample (4 kHz at the
+# satellite's 16 kHz, plenty for a meter) and shown on a dB scale
+VU_DECIMATION = 4
+VU_RANGE_DB = 60.0
+VU_DECAY = 1.5  # full scale per second
+VU_PEAK_HOLD = 0.8  # seconds
+
+
+def _level_from_amplitude(amplitude: float) -> float:
+    """Map a linear amplitude (1.0 = full scale) to 0..1 on the meter's dB scale."""
+    if amplitude <= 0.0:
+        return 0.0
+    return min(1.0, max(0.0, 1.0 + 20.0 * math.log10(amplitude) / VU_RANGE_DB))
+
+
+class VuMeter(Animation):
+    """Live audio level: bar from green to red with a peak marker.
+
+    Fed with the raw S16_LE audio of audio-chunk events (update()); the level
+    falls back smoothly between chunks.
+    """
+
+    def __init__(
+        self,
+        low: Color = _GREEN,
+        high: Color = _RED,
+        peak: Color = _WHITE,
+        priority: int = PRIORITY_STATE,
+    ) -> None:
+        super().__init__(priority)
+        self.low = np.array(low, dtype=np.float32)
+        self.high = np.array(high, dtype=np.float32)
+        self.peak_color = np.array(peak, dtype=np.float32)
+        self._colors: Optional[np.ndarray] = None
+        self.reset()
+
+    def reset(self) -> None:
+        self.level = 0.0
+        self.level_time = 0.0
+        self.peak = 0.0
+        self.peak_time = 0.0
+
+    def update(self, audio: bytes, width: int = 2, channels: int = 1) -> None:
+        """Measure RMS and peak of an audio chunk (first channel only)."""
+        if width != 2:
+            return  # only S16_LE
+
+        # No copy of the chunk, only of the decimated samples
+        samples = np.frombuffer(audio, dtype="<i2", count=len(audio) // 2)[:: channels * VU_DECIMATION]
+        if len(samples) == 0:
+            return
+
+        values = samples.astype(np.float32)
+        rms = math.sqrt(float(np.dot(values, values)) / len(values)) / 32768.0
+        peak = float(np.abs(values).max()) / 32768.0
+
+        now = time.monotonic()
+        self.level = max(_level_from_amplitude(rms), self.level_at(now))
+        self.level_time = now
+        peak_level = _level_from_amplitude(peak)
+        if peak_level >= self.peak_at(now):
+            self.peak = peak_level
+            self.peak_time = now
+
+    def level_at(self, now: float) -> float:
+        return max(0.0, self.level - (now - self.level_time) * VU_DECAY)
+
+    def peak_at(self, now: float) -> float:
+        falling = (now - self.peak_time) - VU_PEAK_HOLD
+        if falling <= 0:
+            return self.peak
+        return max(0.0, self.peak - falling * VU_DECAY)
+
+    def render(self, frame: np.ndarray, elapsed: float) -> None:
+        num_leds = len(frame)
+        if (self._colors is None) or (len(self._colors) != num_leds):
+            ratio = np.linspace(0.0, 1.0, num_leds, dtype=np.float32)[:, None]
+            self._colors = self.low + (self.high - self.low) * ratio
+
+        now = time.monotonic()
+        # Partially lit LED at the top of the bar
+        lit = np.clip(self.level_at(now) * num_leds - np.arange(num_leds, dtype=np.float32), 0.0, 1.0)
+        frame[:] = self._colors * lit[:, None]
+
+        peak = self.peak_at(now)
+        if peak > 0.0:
+            frame[min(num_leds - 1, int(peak * num_leds))] = self.peak_color
+
+
+def _make_output_lut(brightness: float, gamma: float) -> np.ndarray:
+    """Lookup table applying brightness and gamma to 0-255 channel values."""
+    levels = np.arange(256, dtype=np.float64) / 255.0
+    return np.round(255.0 * np.power(levels, gamma) * brightness).astype(np.uint8)
+
+
+def _pixel_writer(pixels: Any) -> Callable[[np.ndarray], None]:
+    """Fastest way to copy an RGB uint8 frame (num_leds x 3) to the strip."""
+    if hasattr(pixels, "write_frame"):
+        return pixels.write_frame
+
+    buffer = getattr(pixels, "_post_brightness_buffer", None)
+    order = getattr(pixels, "_byteorder", None)
+    offset = getattr(pixels, "_offset", 0)
+    if (
+        isinstance(buffer, bytearray)
+        and (order is not None)
+        and (len(order) == 3)
+        and (getattr(pixels, "_pre_brightness_buffer", None) is None)
+    ):
+        # adafruit_pixelbuf with brightness 1.0: write the raw byte buffer in one go
+        device_order = list(order)
+        num_bytes = len(pixels) * 3
+        ordered = np.empty((len(pixels), 3), dtype=np.uint8)
+
+        def write_raw(frame: np.ndarray) -> None:
+            ordered[:, device_order] = frame
+            buffer[offset : offset + num_bytes] = ordered.tobytes()
+
+        return write_raw
+
+    def write_slice(frame: np.ndarray) -> None:
+        pixels[0 : len(frame)] = [tuple(rgb) for rgb in frame.tolist()]
+
+    return write_slice
+
+
+class Zone:
+    """Segment of the strip (start inclusive, stop exclusive) with a priority."""
+
+    def __init__(self, start: int, stop: int, priority: int = 0) -> None:
+        self.start = start
+        self.stop = stop
+        self.priority = priority
+
+    def __repr__(self) -> str:
+        return f"Zone({self.start}-{self.stop - 1}, priority={self.priority})"
+
+
+def parse_zone(value: str) -> Tuple[str, Zone]:
+    """Parse --zone CLIENT=START-END[:PRIORITY] (END is inclusive)."""
+    try:
+        key, spec = value.split("=", 1)
+        spec, _, priority = spec.partition(":")
+        start, end = spec.split("-", 1)
+        return key, Zone(int(start), int(end) + 1, int(priority or 0))
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(
+            f"Invalid zone '{value}' (expected CLIENT=START-END[:PRIORITY])"
+        ) from err
+
+
+class LedLayer:
+    """State and temporary animation of one client, shown on its zone.
+
+    With --vu-meter every layer has its own meter, fed only by its client's audio.
+    """
+
+    def __init__(
+        self, animator: "LedAnimator", client_id: str, zone: Zone, vu_meter: Optional[VuMeter] = None
+    ) -> None:
+        self.animator = animator
+        self.client_id = client_id
+        self.zone = zone
+        self.vu_meter = vu_meter
+        self.state: Animation = Solid(_BLACK)
+        self.state_start = time.monotonic()
+        self.overlay: Optional[Animation] = None
+        self.overlay_start = 0.0
+        self.updated_at = self.state_start
+
+    def play(self, animation: Animation) -> None:
+        """Switch to an animation (temporary ones are shown on top of the state)."""
+        now = time.monotonic()
+        if animation.duration is None:
+            self.state = animation
+            self.state_start = now
+        elif (self.overlay is None) or (animation.priority >= self.overlay.priority):
+            self.overlay = animation
+            self.overlay_start = now
+        else:
+            _LOGGER.debug("Skipping %s, %s has higher priority", animation, self.overlay)
+            return
+
+        self.updated_at = now
+        self.animator.request_render()
+
+    def fade_to(self, color: Color, fade_time: float) -> None:
+        """Fade from what the layer shows now to a solid color (as the new state).
+
+        A running overlay (e.g. the transcript Hold) stays visible; the fade
+        starts from its last color when it ends.
+        """
+        now = time.monotonic()
+        source, elapsed, start = self.state, now - self.state_start, now
+        if self.overlay is not None:
+            remaining = self.overlay.duration - (now - self.overlay_start)  # type: ignore[operator]
+            if remaining > 0:
+                source, elapsed, start = self.overlay, self.overlay.duration, now + remaining  # type: ignore[assignment]
+
+        # Start color: average of what the source shows over the zone
+        segment = np.zeros((max(1, self.zone.stop - self.zone.start), 3), dtype=np.float32)
+        source.render(segment, elapsed)
+        current: Color = tuple(int(round(c)) for c in segment.mean(axis=0))  # type: ignore[assignment]
+
+        if current == color:
+            self.play(Solid(color))
+        else:
+            self.play(Fade(current, color, fade_time))
+            self.state_start = start
+
+    @property
+    def idle(self) -> bool:
+        return (
+            (self.overlay is None)
+            and isinstance(self.state, Solid)
+            and (self.state.color == _BLACK)
+        )
+
+    def rank(self) -> Tuple[bool, int, int, float]:
+        """Sort key for arbitration: active before idle, then zone and animation priority, then newest."""
+        animation = self.overlay or self.state
+        return (not self.idle, self.zone.priority, animation.priority, self.updated_at)
+
+    def render(self, frame: np.ndarray, now: float) -> Optional[float]:
+        """Render into the zone's part of the frame.
+
+        Returns the time until the output changes on its own (None if static).
+        """
+        if self.overlay is not None:
+            elapsed = now - self.overlay_start
+            if not self.overlay.is_done(elapsed):
+                self.overlay.render(frame, elapsed)
+                if self.overlay.static:
+                    return self.overlay.duration - elapsed  # type: ignore[operator]
+                return self.animator.frame_time
+            self.overlay = None
+
+        elapsed = now - self.state_start
+        if isinstance(self.state, Fade) and (elapsed >= self.state.fade_time):
+            # Fade finished: hold the target color without animating
+            self.state = Solid(self.state.end)
+        elif self.state.is_done(elapsed):
+            self.state = Solid(_BLACK)
+        self.state.render(frame, elapsed)
+        return None if self.state.static else self.animator.frame_time
+
+
+class LedAnimator:
+    """Owns the LED strip and renders all clients in one task.
+
+    Every client gets a layer on its zone (--zone, by peer address; the whole
+    strip by default). Where zones overlap, the highest ranked layer wins
+    (see LedLayer.rank). Event handlers only call play(); the render task
+    updates the strip at a fixed frame rate while something is animating and
+    sleeps while the output is static. Frames are rendered into a NumPy array,
+    brightness and gamma are applied through a lookup table, and there is at
+    most one show() per frame.
+    """
+
+    def __init__(
+        self,
+        pixels: Any,
+        fps: float = 30.0,
+        brightness: float = 1.0,
+        gamma: float = 1.0,
+        zones: Optional[Dict[str, Zone]] = None,
+        metrics: Any = NULL_METRICS,
+    ) -> None:
+        self.pixels = pixels
+        self.frame_time = 1.0 / fps
+        self.frame = np.zeros((len(pixels), 3), dtype=np.float32)
+        self.zones = zones or {}
+        self.default_zone = self.zones.get("default", Zone(0, len(pixels)))
+        self.layers: List[LedLayer] = []
+        self._lut = _make_output_lut(brightness, gamma)
+        self._write = _pixel_writer(pixels)
+        self._last_output: Optional[np.ndarray] = None
+        self._last_frame = 0.0
+        self._frame_due: Optional[float] = None
+        self._event_time: Optional[float] = None
+        self._changed = asyncio.Event()
+        self.stats: Counter = Counter()
+
+        # Timing of frames and of events until their frame is on the strip
+        self.metrics = metrics
+        self._fps_frames = 0
+        self._fps_time = time.monotonic()
+        metrics.add_collector(self._collect_metrics)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._render_loop(), name="led render loop")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def add_layer(self, client_key: str, client_id: str, vu_meter: Optional[VuMeter] = None) -> LedLayer:
+        """Create the layer of a newly connected client."""
+        zone = self.zones.get(client_key, self.default_zone)
+        zone = Zone(max(0, zone.start), min(len(self.frame), zone.stop), zone.priority)
+        layer = LedLayer(self, client_id, zone, vu_meter)
+        self.layers.append(layer)
+        _LOGGER.debug("Client %s (%s) uses %s", client_id, client_key, zone)
+        self.request_render()
+        return layer
+
+    def remove_layer(self, layer: LedLayer) -> None:
+        if layer in self.layers:
+            self.layers.remove(layer)
+            self.request_render()
+
+    def request_render(self) -> None:
+        if self._changed.is_set():
+            # Not rendered yet: only the latest change reaches the strip
+            self.stats["coalesced"] += 1
+        else:
+            self._changed.set()
+
+    def event_received(self, received: float) -> None:
+        """Remember the oldest event not yet shown (for event-to-photon timing)."""
+        if self._event_time is None:
+            self._event_time = received
+
+    def _collect_metrics(self) -> None:
+        for name, value in self.stats.items():
+            self.metrics.set_counter(name, value)
+
+        # Frames shown per second since the last report
+        now = time.monotonic()
+        if now > self._fps_time:
+            self.metrics.set_gauge("fps", (self.stats["frames"] - self._fps_frames) / (now - self._fps_time))
+        self._fps_frames = self.stats["frames"]
+        self._fps_time = now
+
+    def log_stats(self) -> None:
+        _LOGGER.info(
+            "%s events (%s dropped), %s changes coalesced, %s frames shown, %s unchanged, "
+            "%s late (%s missed)",
+            self.stats["events"],
+            self.stats["dropped"],
+            self.stats["coalesced"],
+            self.stats["frames"],
+            self.stats["unchanged"],
+            self.stats["late_frames"],
+            self.stats["missed_frames"],
+        )
+
+    def _render_frame(self, now: float) -> Optional[float]:
+        """Render all visible layers into the frame buffer.
+
+        Returns the time until the output changes on its own (None if static).
+        """
+        self.frame[:] = 0
+        covered = np.zeros(len(self.frame), dtype=bool)
+        next_change: Optional[float] = None
+
+        for layer in sorted(self.layers, key=LedLayer.rank, reverse=True):
+            zone = layer.zone
+            visible = ~covered[zone.start : zone.stop]
+            if not visible.any():
+                # Completely hidden by higher ranked layers
+                continue
+
+            segment = self.frame[zone.start : zone.stop]
+            if visible.all():
+                layer_change = layer.render(segment, now)
+            else:
+                rendered = np.empty_like(segment)
+                layer_change = layer.render(rendered, now)
+                segment[visible] = rendered[visible]
+            covered[zone.start : zone.stop] = True
+
+            if (layer_change is not None) and ((next_change is None) or (layer_change < next_change)):
+                next_change = layer_change
+
+        return next_change
+
+    def _show_frame(self) -> bool:
+        """Write the frame to the strip; False if it didn't change."""
+        output = self._lut[np.clip(self.frame, 0, 255).astype(np.uint8)]
+        if (self._last_output is not None) and np.array_equal(output, self._last_output):
+            self.stats["unchanged"] += 1
+            return False
+
+        self._write(output)
+        start = time.monotonic()
+        self.pixels.show()
+        self.metrics.observe_since("show", start)
+        self._last_output = output
+        self.stats["frames"] += 1
+        return True
+
+    async def _render_loop(self) -> None:
+        while True:
+            # Changes arriving less than a frame after the last one are
+            # collected and shown together
+            delay = self._last_frame + self.frame_time - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            self._changed.clear()
+            now = time.monotonic()
+            if self._frame_due is not None:
+                # Animating: was this frame rendered in time?
+                late = now - self._frame_due
+                if late > self.frame_time / 2:
+                    self.stats["late_frames"] += 1
+                    self.stats["missed_frames"] += int(late // self.frame_time)
+
+            self._last_frame = now
+            event_time, self._event_time = self._event_time, None
+            next_change = self._render_frame(now)
+            shown = self._show_frame()
+            self.metrics.observe_since("frame", now)
+            if shown and (event_time is not None):
+                self.metrics.observe_since("event_to_photon", event_time)
+
+            if next_change is None:
+                # Nothing to animate: sleep until the next play()
+                self._frame_due = None
+                await self._changed.wait()
+            else:
+                self._frame_due = now + max(0.0, next_change)
+                try:
+                    await asyncio.wait_for(self._changed.wait(), max(0.0, next_change))
+                except asyncio.TimeoutError:
+                    pass
+
+
+# Animations available for --effect while the satellite is listening
+LISTENING_EFFECTS: Dict[str, Callable[[], Animation]] = {
+    "solid": lambda: Solid(_YELLOW),
+    "pulse": lambda: Pulse(_YELLOW, period=1.5),
+    "chase": lambda: Chase(_YELLOW, background=(40, 40, 0)),
+    "gradient": lambda: Gradient(_YELLOW, _BLUE),
+}
+
+
+# Handler method for each event type that changes the LEDs (first match wins)
+_EVENT_HANDLERS: Tuple[Tuple[Callable[[str], bool], str], ...] = (
+    (StreamingStarted.is_type, "_on_listening"),
+    (Detection.is_type, "_on_detection"),
+    (VoiceStarted.is_type, "_on_listening"),
+    (Transcript.is_type, "_on_transcript"),
+    (StreamingStopped.is_type, "_on_idle"),
+    (RunSatellite.is_type, "_on_idle"),
+    (SatelliteConnected.is_type, "_on_connected"),
+    (SatelliteDisconnected.is_type, "_on_disconnected"),
+)
+
+# Event type -> handler method (None for ignored types), filled on first use
+_EVENT_ROUTES: Dict[str, Optional[str]] = {}
+
+
+def route_event(event_type: str) -> Optional[str]:
+    """Name of the handler method for an event type (None if the LEDs don't care)."""
+    try:
+        return _EVENT_ROUTES[event_type]
+    except KeyError:
+        pass
+
+    route = next((method for is_type, method in _EVENT_HANDLERS if is_type(event_type)), None)
+    _EVENT_ROUTES[event_type] = route
+    return route
+
+
 class LEDsEventHandler(AsyncEventHandler):
     """Event handler for clients."""
 
     def __init__(
         self,
         cli_args: argparse.Namespace,
-        pixels: neopixel.NeoPixel,
+        animator: "LedAnimator",
         *args,
+        publisher: Optional["StatePublisher"] = None,
         **kwargs,
     ) -> None:
         super().__init__(*args, **kwargs)
 
         self.cli_args = cli_args
         self.client_id = str(time.monotonic_ns())
-        self.pixels = pixels
+        self.animator = animator
+        self.publisher = publisher
+
+        # Zones are assigned by peer host ("local" for unix sockets)
+        peer = self.writer.get_extra_info("peername")
+        self.client_key = peer[0] if isinstance(peer, tuple) else "local"
+        self.layer = animator.add_layer(
+            self.client_key, self.client_id, VuMeter() if cli_args.vu_meter else None
+        )
+        self.vu_meter = self.layer.vu_meter
 
-        _LOGGER.debug("Client connected: %s", self.client_id)
+        _LOGGER.debug("Client connected: %s (%s)", self.client_id, self.client_key)
 
     async def handle_event(self, event: Event) -> bool:
-        _LOGGER.debug(event)
-
-        if StreamingStarted.is_type(event.type):
-            self.color(_YELLOW)
-        elif Detection.is_type(event.type):
-            self.color(_BLUE)
-            await asyncio.sleep(1.0)  # show for 1 sec
-        elif VoiceStarted.is_type(event.type):
-            self.color(_YELLOW)
-        elif Transcript.is_type(event.type):
-            self.color(_GREEN)
-            await asyncio.sleep(1.0)  # show for 1 sec
-        elif StreamingStopped.is_type(event.type):
-            self.color(_BLACK)
-        elif RunSatellite.is_type(event.type):
-            self.color(_BLACK)
-        elif SatelliteConnected.is_type(event.type):
-            # Flash
-            for _ in range(3):
-                self.color(_GREEN)
-                await asyncio.sleep(0.3)
-                self.color(_BLACK)
-                await asyncio.sleep(0.3)
-        elif SatelliteDisconnected.is_type(event.type):
-            self.color(_RED)
+        stats = self.animator.stats
+        stats["events"] += 1
+
+        if (self.vu_meter is not None) and AudioChunk.is_type(event.type):
+            # Mic audio drives the meter on this client's zone
+            if event.payload:
+                self.vu_meter.update(event.payload, event.data.get("width", 2), event.data.get("channels", 1))
+            return True
+
+        route = route_event(event.type)
+        is_state = event.type in STATE_EVENT_TYPES
+        if (route is None) and (not is_state):
+            # Audio chunks etc.: dropped without logging or formatting
+            stats["dropped"] += 1
+            return True
+
+        _LOGGER.debug("Event from %s: %s", self.client_id, event)
+        received = time.monotonic()
+        self.animator.event_received(received)
 
+        if is_state and (self.publisher is not None):
+            await self.publisher.publish(event)
+
+        if route is not None:
+            getattr(self, route)()
+
+        self.animator.metrics.observe_since("event_handling", received)
         return True
 
-    def color(self, rgb: Tuple[int, int, int]) -> None:
-        """Set all LEDs to the specified RGB color."""
-        self.pixels.fill(rgb)
-        self.pixels.show()
+    def _on_listening(self) -> None:
+        if self.vu_meter is not None:
+            if self.layer.state is not self.vu_meter:
+                # New session: don't start from the last session's level and peak
+                self.vu_meter.reset()
+            self.layer.play(self.vu_meter)
+        else:
+            self.layer.play(LISTENING_EFFECTS[self.cli_args.effect]())
+
+    def _on_detection(self) -> None:
+        self.layer.play(Hold(_BLUE, 1.0))  # show for 1 sec
+
+    def _on_transcript(self) -> None:
+        self.layer.play(Hold(_GREEN, 1.0))  # show for 1 sec
+
+    def _on_idle(self) -> None:
+        self.layer.fade_to(_BLACK, IDLE_FADE_TIME)
+
+    def _on_connected(self) -> None:
+        self.layer.play(Flash(_GREEN, count=3, period=0.6))
+
+    def _on_disconnected(self) -> None:
+        self.color(_RED)
+
+    def color(self, rgb: Color) -> None:
+        """Set the client's LEDs to the specified RGB color (as the current state)."""
+        self.layer.play(Solid(rgb))
+
+    async def disconnect(self) -> None:
+        _LOGGER.debug("Client disconnected: %s", self.client_id)
+        self.animator.remove_layer(self.layer)
+
+
+# -----------------------------------------------------------------------------
+
+# Events forwarded to state subscribers (everything s330_buttons.py needs to
+# decide between cancel and wake without asking the satellite's /status)
+STATE_EVENT_TYPES = {
+    "detection",
+    "streaming-started",
+    "streaming-stopped",
+    "voice-started",
+    "transcript",
+    "run-satellite",
+    "pause-satellite",
+    "satellite-connected",
+    "satellite-disconnected",
+}
+
+
+class StatePublisher:
+    """Forwards satellite state events to connected subscribers and in-process listeners."""
+
+    def __init__(self) -> None:
+        self.subscribers: Set["StateSubscriberHandler"] = set()
+        self.listeners: List[Callable[[str], None]] = []
+        self.last_event: Optional[Event] = None
+
+    async def publish(self, event: Event) -> None:
+        """Send event type (without data/payload) to all subscribers."""
+        for listener in self.listeners:
+            listener(event.type)
+        self.last_event = Event(type=event.type)
+        for subscriber in list(self.subscribers):
+            try:
+                await subscriber.write_event(self.last_event)
+            except (ConnectionError, OSError):
+                _LOGGER.debug("Dropping state subscriber: %s", subscriber.client_id)
+                self.subscribers.discard(subscriber)
+
+    async def subscribe(self, subscriber: "StateSubscriberHandler") -> None:
+        """Register subscriber and bring it up to date with the last state."""
+        self.subscribers.add(subscriber)
+        if self.last_event is not None:
+            await subscriber.write_event(self.last_event)
+
+    def unsubscribe(self, subscriber: "StateSubscriberHandler") -> None:
+        self.subscribers.discard(subscriber)
+
+
+class StateSubscriberHandler(AsyncEventHandler):
+    """Connection of a state subscriber (events are only sent, never handled)."""
+
+    def __init__(self, publisher: StatePublisher, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+        self.publisher = publisher
+        self.client_id = str(time.monotonic_ns())
+
+    async def run(self) -> None:
+        _LOGGER.debug("State subscriber connected: %s", self.client_id)
+        await self.publisher.subscribe(self)
+        await super().run()
+
+    async def handle_event(self, event: Event) -> bool:
+        return True
+
+    async def disconnect(self) -> None:
+        _LOGGER.debug("State subscriber disconnected: %s", self.client_id)
+        self.publisher.unsubscribe(self)
+
+
+# -----------------------------------------------------------------------------
+
+
+def _make_spi_lut() -> np.ndarray:
+    """SPI bit pattern (4 bytes) for every possible color byte."""
+    lut = np.zeros((256, 4), dtype=np.uint8)
+    for value in range(256):
+        pattern = 0
+        for bit in range(7, -1, -1):
+            pattern = (pattern << 4) | (0b1110 if (value >> bit) & 1 else 0b1000)
+        lut[value] = list(pattern.to_bytes(4, "big"))
+    return lut
+
+
+WS2812_SPI_LUT = _make_spi_lut()
+
+
+def encode_ws2812_spi(data: Any, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Encode color bytes (already in strip order) into one SPI transfer.
+
+    The result starts with a zero byte (keeps MOSI low before the first bit)
+    and ends with the reset/latch period. Pass a buffer from
+    ws2812_spi_buffer() as out to avoid allocating one per frame.
+    """
+    values = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray)) else np.ravel(data)
+    if out is None:
+        out = ws2812_spi_buffer(len(values))
+
+    encoded = out[1 : 1 + 4 * len(values)].reshape(-1, 4)
+    np.take(WS2812_SPI_LUT, values, axis=0, out=encoded, mode="clip")
+    return out
+
+
+def ws2812_spi_buffer(num_bytes: int) -> np.ndarray:
+    """Zeroed SPI transfer buffer for num_bytes color bytes."""
+    return np.zeros(1 + 4 * num_bytes + WS2812_SPI_RESET_BYTES, dtype=np.uint8)
+
+
+class SpiPixels:
+    """WS2812B strip on the SPI MOSI pin (only needs access to /dev/spidev*).
+
+    Works like a NeoPixel object with auto_write=False. show() encodes the
+    frame through WS2812_SPI_LUT and sends it with a single write().
+    """
+
+    def __init__(
+        self,
+        device: str,
+        num_leds: int,
+        pixel_order: str = LED_ORDER,
+        speed_hz: int = WS2812_SPI_SPEED_HZ,
+    ) -> None:
+        self.device = device
+        self._fd = os.open(device, os.O_WRONLY)
+        self._configure(speed_hz)
+
+        # Column of the RGB frame for every byte sent to the strip
+        self._order = ["RGB".index(channel) for channel in pixel_order]
+        self._frame = np.zeros((num_leds, 3), dtype=np.uint8)
+        self._buffer = ws2812_spi_buffer(num_leds * 3)
+
+    def _configure(self, speed_hz: int) -> None:
+        try:
+            fcntl.ioctl(self._fd, _SPI_IOC_WR_MODE, struct.pack("B", 0))
+            fcntl.ioctl(self._fd, _SPI_IOC_WR_BITS_PER_WORD, struct.pack("B", 8))
+            fcntl.ioctl(self._fd, _SPI_IOC_WR_MAX_SPEED_HZ, struct.pack("I", speed_hz))
+        except OSError as err:
+            # Not a spidev device (e.g. a plain file for benchmarks)
+            _LOGGER.warning("Could not configure SPI on %s: %s", self.device, err)
+
+    def __len__(self) -> int:
+        return len(self._frame)
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        self._frame[index] = value
+
+    def __getitem__(self, index: Any) -> Any:
+        return self._frame[index]
+
+    def fill(self, color: Color) -> None:
+        self._frame[:] = color
+
+    def write_frame(self, frame: np.ndarray) -> None:
+        self._frame[:] = frame
+
+    def show(self) -> None:
+        encode_ws2812_spi(self._frame[:, self._order], out=self._buffer)
+        os.write(self._fd, self._buffer)
+
+    def deinit(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
 
 
 # -----------------------------------------------------------------------------
@@ -1,12 +1,29 @@
-import os
 import time
+
+# Startzeitpunkt für den Startup-Report (vor allen anderen Imports)
+_MODULE_START = time.monotonic()
+
+import os
+import sys
+import errno
+import glob
+import select
+import threading
+import socket
+import urllib.parse
+import ctypes
+import ctypes.util
 import subprocess
 import re
 import json
 import logging
 import datetime
 import argparse
-import requests
+import asyncio
+import signal
+
+import service_logging
+from service_metrics import NULL_METRICS, Metrics, start_reporting, stop_reporting
 
 # Konfiguriere das Logging
 logger = logging.getLogger("s330_buttons")
@@ -15,6 +32,10 @@ logger = logging.getLogger("s330_buttons")
 log_format = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s', 
                              datefmt='%Y-%m-%d %H:%M:%S')
 
+# Hintergrund-Thread für Konsole und Log-Datei (siehe setup_logging). Meldungen werden erst dort
+# formatiert, daher auf häufig durchlaufenen Pfaden %-Argumente statt f-Strings verwenden.
+log_pipeline = None
+
 # USB VID/PID of the Anker PowerConf S330
 VID = 0x291a
 PID = 0x3308
@@ -24,17 +45,143 @@ WYOMING_API_HOST = "127.0.0.1"
 WYOMING_API_PORT = 8080
 WYOMING_API_BASE_URL = f"http://{WYOMING_API_HOST}:{WYOMING_API_PORT}/api"
 
-def get_available_audio_controls():
-    """Determines available audio controls for volume adjustment"""
+# Wake-Word für trigger-wake; None = das im Satellite konfigurierte
+WAKE_WORD = None
+
+# Erkennung des laufenden wyoming-satellite über /proc/*/cmdline (siehe SatelliteDiscovery).
+# Solange derselbe Prozess läuft, kostet eine Prüfung nur das Lesen von /proc/<pid>/stat.
+PROC_DIR = "/proc"
+SATELLITE_PROCESS_NAMES = ("wyoming_satellite", "wyoming-satellite")
+SATELLITE_WATCH_INTERVAL = 5.0
+
+# Timeouts (Sekunden) und Circuit Breaker für die Web-API
+API_CONNECT_TIMEOUT = 0.5
+API_READ_TIMEOUT = 2
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_RESET_TIMEOUT = 5.0
+
+# Gemeinsamer API-Client (siehe get_api_client)
+_api_client = None
+_api_client_lock = threading.Lock()
+
+# requests wird erst mit dem API-Client importiert (siehe _load_requests)
+requests = None
+
+# Cache der beim Start ermittelten Werte (siehe StartupCache)
+DEFAULT_CACHE_FILE = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                                  "s330_buttons.json")
+STARTUP_CACHE_VERSION = 1
+
+# Zustandsereignisse aus dem Event-Stream des LED-Service (--state-uri)
+# und ob der Satellite danach aktiv ist
+SATELLITE_STATE_EVENTS = {
+    "detection": True,
+    "streaming-started": True,
+    "voice-started": True,
+    "streaming-stopped": False,
+    "run-satellite": False,
+    "pause-satellite": False,
+    "satellite-disconnected": False,
+}
+# Ein "aktiver" Zustand ohne weitere Events gilt nach dieser Zeit (Sekunden) als veraltet
+STATE_MIRROR_MAX_ACTIVE_AGE = 60.0
+
+# Direkte Wyoming-Verbindung für Trigger/Cancel (--wyoming-control-uri), HTTP-API bleibt Fallback.
+# Die Event-Typen entsprechen den Endpunkten der Web-API, sind aber keine Standard-Events: Mit
+# --state-uri gilt ein Event erst als zugestellt, wenn der Satellite innerhalb von
+# WYOMING_CONFIRM_TIMEOUT den passenden Zustandswechsel meldet, sonst wird die HTTP-API benutzt.
+WYOMING_PROTOCOL_VERSION = "1.5.2"
+WYOMING_TRIGGER_EVENT = "trigger-wake"
+WYOMING_CANCEL_EVENT = "cancel"
+WYOMING_SEND_TIMEOUT = 0.2
+WYOMING_CONFIRM_TIMEOUT = 0.5
+WYOMING_RECONNECT_DELAY = 1.0
+_control_client = None
+
+# Gespiegelter Satellite-Zustand (siehe SatelliteStateMirror), None = immer /status abfragen
+_state_mirror = None
+
+# Latenz-Histogramme (--metrics-port/--metrics-interval), sonst ein Objekt ohne Wirkung
+metrics = NULL_METRICS
+
+# sysfs-Verzeichnis der hidraw-Knoten (für den select-basierten Reader)
+HIDRAW_SYSFS_DIR = "/sys/class/hidraw"
+HID_REPORT_SIZE = 64
+
+# Ab-/Anstecken der S330 (siehe HotplugHidrawReader): Kernel-uevents über Netlink, ohne udev.
+# Ohne Netlink-Socket wird nur, solange das Gerät fehlt, alle HOTPLUG_RESCAN_INTERVAL Sekunden gesucht.
+# Existieren Knoten, lassen sich aber HOTPLUG_RETRY_TIME lang nicht öffnen (udev-Rechte), wird beendet.
+NETLINK_KOBJECT_UEVENT = 15
+HOTPLUG_RESCAN_INTERVAL = 2.0
+HOTPLUG_RETRY_TIME = 2.0
+HOTPLUG_RETRY_DELAY = 0.05
+# Der Kernel legt die hidraw-Knoten einzeln je Interface an: erst öffnen, wenn sich die gefundene
+# Menge so lange nicht mehr geändert hat
+HOTPLUG_SETTLE_TIME = 0.1
+
+# Lesefehler bei den hidapi-Readern: Wartezeit im Lese-Thread verdoppelt sich bis zu diesem Wert
+READ_ERROR_DELAY = 1.0
+READ_ERROR_MAX_DELAY = 30.0
+
+# Schrittweite der Lautstärketasten in Prozent
+VOLUME_STEP = 5
+
+# Lautstärketasten: Tastendrücke innerhalb dieses Fensters (Sekunden) werden zu einem Mixer-Schreibzugriff
+# zusammengefasst. Gehaltene Taste: Wiederholung nach VOLUME_HOLD_DELAY, Intervall wird pro Schritt um
+# VOLUME_REPEAT_ACCELERATION kürzer (bis VOLUME_REPEAT_MIN_INTERVAL). Nach VOLUME_RESYNC_AFTER Sekunden
+# ohne Tastendruck wird die Lautstärke neu gelesen (falls sie jemand anderes geändert hat).
+VOLUME_COALESCE_WINDOW = 0.1
+VOLUME_HOLD_DELAY = 0.4
+VOLUME_REPEAT_INTERVAL = 0.15
+VOLUME_REPEAT_MIN_INTERVAL = 0.04
+VOLUME_REPEAT_ACCELERATION = 0.8
+VOLUME_HOLD_MAX = 10.0
+VOLUME_RESYNC_AFTER = 30.0
+
+# Gleichzeitig laufende Tastenaktionen; nach ACTION_TIMEOUT Sekunden wird eine noch laufende Aktion gemeldet
+MAX_CONCURRENT_ACTIONS = 4
+ACTION_TIMEOUT = 10.0
+
+# Tasten des S330: Name -> (Report-ID, Bitmaske im ersten Payload-Byte). Ein Report meldet alle
+# gerade gedrückten Tasten seiner Report-ID, ein leerer Payload (0x00) das Loslassen.
+DEFAULT_BUTTONS = {
+    "volume_up": (1, 0x08),
+    "volume_down": (1, 0x10),
+    "phone": (2, 0x03),
+}
+# Tastenbelegung (Taste oder Kombination "a+b" -> Geste -> Aktion), überschreibbar per --button-config
+DEFAULT_BINDINGS = {
+    "volume_up": {"press": "volume_up"},
+    "volume_down": {"press": "volume_down"},
+    "phone": {"press": "toggle_satellite"},
+}
+BUTTON_GESTURES = ("press", "long_press", "double_press")
+BUTTON_ACTIONS = ("volume_up", "volume_down", "toggle_satellite", "wake", "cancel")
+ACTION_ICONS = {"volume_up": "🔊", "volume_down": "🔉", "toggle_satellite": "📞", "wake": "🎙", "cancel": "⏹"}
+# Zeiten der Gestenerkennung (Sekunden): Mindestdauer eines langen Drucks, maximaler Abstand zweier
+# Drücke eines Doppeldrucks, Wartezeit auf die zweite Taste einer Kombination
+LONG_PRESS_TIME = 0.8
+DOUBLE_PRESS_WINDOW = 0.35
+CHORD_WINDOW = 0.08
+
+# Per ctypes geladene libasound (siehe _load_libasound)
+_libasound = None
+
+def get_available_audio_controls(controls=None):
+    """Determines available audio controls for volume adjustment
+
+    If `controls` is given (e.g. listed in-process via libasound), no amixer subprocess is started.
+    """
     mixer_controls = []
     
     try:
-        # Versuche zuerst, alle verfügbaren Mixer zu bekommen
-        out = subprocess.check_output(["amixer", "scontrols"], text=True)
-        logger.debug(f"amixer scontrols output:\n{out}")
-        
-        # Suche nach Mustern wie 'Simple mixer control 'Master',0' oder 'Simple mixer control 'PCM',0'
-        controls = re.findall(r"Simple mixer control '([^']+)',\d+", out)
+        if controls is None:
+            # Versuche zuerst, alle verfügbaren Mixer zu bekommen
+            out = subprocess.check_output(["amixer", "scontrols"], text=True)
+            logger.debug(f"amixer scontrols output:\n{out}")
+            
+            # Suche nach Mustern wie 'Simple mixer control 'Master',0' oder 'Simple mixer control 'PCM',0'
+            controls = re.findall(r"Simple mixer control '([^']+)',\d+", out)
         
         if controls:
             logger.debug(f"Found audio controls: {controls}")
@@ -60,38 +207,823 @@ def get_available_audio_controls():
     logger.warning("No audio controls found, audio buttons will be disabled")
     return None  # Rückgabe von None signalisiert, dass keine Lautstärkeanpassung möglich ist
 
-def get_wakeword_name():
-    """Reads the configured WakeWord name from the process arguments"""
+def _load_libasound():
+    """Lädt libasound per ctypes und setzt die benötigten Funktionssignaturen"""
+    global _libasound
+    if _libasound is not None:
+        return _libasound
+
     try:
-        # Erweiterte Suche nach dem Wyoming-Satellite-Prozess
-        commands = [
-            "ps -ef | grep wyoming-satellite | grep -v grep | grep -- '--wake-word-name' | head -1",
-            "ps -ef | grep wyoming-satellite | grep -v grep | head -1",
-            "ps aux | grep wyoming-satellite | grep -v grep | head -1"
-        ]
-        
-        for cmd in commands:
+        lib = ctypes.CDLL("libasound.so.2")
+    except OSError:
+        name = ctypes.util.find_library("asound")
+        if not name:
+            raise OSError("libasound not found")
+        lib = ctypes.CDLL(name)
+
+    c_void_p, c_int, c_long = ctypes.c_void_p, ctypes.c_int, ctypes.c_long
+    signatures = {
+        "snd_mixer_open": (c_int, [ctypes.POINTER(c_void_p), c_int]),
+        "snd_mixer_close": (c_int, [c_void_p]),
+        "snd_mixer_attach": (c_int, [c_void_p, ctypes.c_char_p]),
+        "snd_mixer_selem_register": (c_int, [c_void_p, c_void_p, c_void_p]),
+        "snd_mixer_load": (c_int, [c_void_p]),
+        "snd_mixer_handle_events": (c_int, [c_void_p]),
+        "snd_mixer_first_elem": (c_void_p, [c_void_p]),
+        "snd_mixer_elem_next": (c_void_p, [c_void_p]),
+        "snd_mixer_find_selem": (c_void_p, [c_void_p, c_void_p]),
+        "snd_mixer_selem_get_name": (ctypes.c_char_p, [c_void_p]),
+        "snd_mixer_selem_id_sizeof": (ctypes.c_size_t, []),
+        "snd_mixer_selem_id_set_index": (None, [c_void_p, ctypes.c_uint]),
+        "snd_mixer_selem_id_set_name": (None, [c_void_p, ctypes.c_char_p]),
+        "snd_mixer_selem_has_playback_volume": (c_int, [c_void_p]),
+        "snd_mixer_selem_get_playback_volume_range": (c_int, [c_void_p, ctypes.POINTER(c_long), ctypes.POINTER(c_long)]),
+        "snd_mixer_selem_get_playback_volume": (c_int, [c_void_p, c_int, ctypes.POINTER(c_long)]),
+        "snd_mixer_selem_set_playback_volume_all": (c_int, [c_void_p, c_long]),
+        "snd_strerror": (ctypes.c_char_p, [c_int]),
+    }
+    for func_name, (restype, argtypes) in signatures.items():
+        func = getattr(lib, func_name)
+        func.restype = restype
+        func.argtypes = argtypes
+
+    _libasound = lib
+    return lib
+
+
+class AlsaMixer:
+    """Hält einen libasound-Mixer-Handle offen und ändert die Lautstärke im Prozess (ohne Subprozess)"""
+
+    name = "alsa"
+
+    def __init__(self, device="default"):
+        self._lib = _load_libasound()
+        self._handle = ctypes.c_void_p()
+        self._elem = None
+        self.control = None
+
+        self._check(self._lib.snd_mixer_open(ctypes.byref(self._handle), 0), "snd_mixer_open")
+        try:
+            self._check(self._lib.snd_mixer_attach(self._handle, device.encode()), f"snd_mixer_attach({device})")
+            self._check(self._lib.snd_mixer_selem_register(self._handle, None, None), "snd_mixer_selem_register")
+            self._check(self._lib.snd_mixer_load(self._handle), "snd_mixer_load")
+        except OSError:
+            self._lib.snd_mixer_close(self._handle)
+            raise
+
+    def _check(self, result, what):
+        if result < 0:
+            raise OSError(f"{what} failed: {self._lib.snd_strerror(result).decode()}")
+        return result
+
+    def list_controls(self):
+        """Entspricht 'amixer scontrols', nur ohne Subprozess"""
+        controls = []
+        elem = self._lib.snd_mixer_first_elem(self._handle)
+        while elem:
+            controls.append(self._lib.snd_mixer_selem_get_name(elem).decode())
+            elem = self._lib.snd_mixer_elem_next(elem)
+        return controls
+
+    def select_control(self, control):
+        """Wählt das Simple-Mixer-Control (Index 0) aus, dessen Lautstärke geändert wird"""
+        selem_id = ctypes.create_string_buffer(self._lib.snd_mixer_selem_id_sizeof())
+        self._lib.snd_mixer_selem_id_set_index(selem_id, 0)
+        self._lib.snd_mixer_selem_id_set_name(selem_id, control.encode())
+
+        elem = self._lib.snd_mixer_find_selem(self._handle, selem_id)
+        if not elem:
+            raise OSError(f"Mixer control '{control}' not found")
+        if not self._lib.snd_mixer_selem_has_playback_volume(elem):
+            raise OSError(f"Mixer control '{control}' has no playback volume")
+
+        vol_min, vol_max = ctypes.c_long(), ctypes.c_long()
+        self._check(self._lib.snd_mixer_selem_get_playback_volume_range(
+            elem, ctypes.byref(vol_min), ctypes.byref(vol_max)), "snd_mixer_selem_get_playback_volume_range")
+
+        self._elem = elem
+        self._min = vol_min.value
+        self._max = vol_max.value
+        self.control = control
+
+    def _get_raw(self):
+        # Änderungen anderer Prozesse (z.B. alsamixer) übernehmen
+        self._lib.snd_mixer_handle_events(self._handle)
+        value = ctypes.c_long()
+        self._check(self._lib.snd_mixer_selem_get_playback_volume(self._elem, 0, ctypes.byref(value)),
+                    "snd_mixer_selem_get_playback_volume")
+        return value.value
+
+    def _set_raw(self, value):
+        value = max(self._min, min(self._max, value))
+        self._check(self._lib.snd_mixer_selem_set_playback_volume_all(self._elem, value),
+                    "snd_mixer_selem_set_playback_volume_all")
+
+    def get_volume(self):
+        """Aktuelle Lautstärke in Prozent"""
+        if self._max == self._min:
+            return 0
+        return round((self._get_raw() - self._min) * 100 / (self._max - self._min))
+
+    def set_volume(self, percent):
+        percent = max(0, min(100, percent))
+        self._set_raw(self._min + round(percent * (self._max - self._min) / 100))
+        return True
+
+    def change_volume(self, delta_percent):
+        """Relative Änderung wie 'amixer sset <control> 5%+' bzw. '5%-'"""
+        step = max(1, round(abs(delta_percent) * (self._max - self._min) / 100))
+        self._set_raw(self._get_raw() + (step if delta_percent > 0 else -step))
+        return True
+
+    def close(self):
+        if self._handle:
+            self._lib.snd_mixer_close(self._handle)
+            self._handle = ctypes.c_void_p()
+
+
+class AmixerMixer:
+    """Lautstärke über amixer-Subprozesse (bisheriges Verhalten, Fallback)"""
+
+    name = "amixer"
+
+    def __init__(self, control):
+        self.control = control
+
+    def _run(self, value):
+        cmd = ["amixer", "sset", self.control, value]
+        logger.debug(f"Running command: {' '.join(cmd)}")
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            logger.warning(f"Volume command failed: {result.stderr.strip()}")
+            return None
+        logger.debug(f"Volume command succeeded: {result.stdout.strip()}")
+        return result.stdout
+
+    def get_volume(self):
+        out = subprocess.check_output(["amixer", "sget", self.control], text=True)
+        match = re.search(r"\[(\d+)%\]", out)
+        return int(match.group(1)) if match else None
+
+    def set_volume(self, percent):
+        return self._run(f"{max(0, min(100, percent))}%") is not None
+
+    def change_volume(self, delta_percent):
+        return self._run(f"{abs(delta_percent)}%{'+' if delta_percent > 0 else '-'}") is not None
+
+    def close(self):
+        pass
+
+
+class NullMixer:
+    """Mixer ohne Audiogerät (Replay, Benchmarks): merkt sich nur die Lautstärke"""
+
+    name = "null"
+
+    def __init__(self, level=50, delay=0.0):
+        self.level = level
+        self.delay = delay  # simulierte Dauer eines Schreibzugriffs (Sekunden)
+        self.writes = 0
+
+    def get_volume(self):
+        return self.level
+
+    def set_volume(self, percent):
+        if self.delay:
+            time.sleep(self.delay)
+        self.level = max(0, min(100, percent))
+        self.writes += 1
+        return True
+
+    def change_volume(self, delta_percent):
+        return self.set_volume(self.level + delta_percent)
+
+    def close(self):
+        pass
+
+
+def create_mixer(backend="auto", control=None, cache=None):
+    """Erzeugt das Mixer-Backend und ermittelt bei Bedarf das Audio-Control
+
+    Ein ermitteltes Control wird im StartupCache gemerkt und beim nächsten Start nur noch geprüft.
+    Gibt None zurück, wenn kein Audio-Control verfügbar ist (Lautstärketasten deaktiviert).
+    """
+    if backend == "null":
+        logger.info("Using null mixer (no audio device)")
+        return NullMixer()
+
+    cached = cache.get("mixer_control") if (cache and not control) else None
+
+    if backend in ("auto", "alsa"):
+        mixer = None
+        try:
+            mixer = AlsaMixer()
+            if cached:
+                try:
+                    start = time.monotonic()
+                    mixer.select_control(cached)
+                    cache.measured("mixer_control", time.monotonic() - start, hit=True)
+                    logger.info(f"Using in-process ALSA mixer for '{cached}' (cached)")
+                    return mixer
+                except OSError as e:
+                    logger.info(f"Cached mixer control is no longer usable: {e}")
+                    cache.discard("mixer_control")
+            discovered = control is None
+            start = time.monotonic()
+            control = control or get_available_audio_controls(mixer.list_controls())
+            if control is None:
+                mixer.close()
+                return None
+            mixer.select_control(control)
+            if discovered and cache is not None:
+                cache.set("mixer_control", control)
+                cache.measured("mixer_control", time.monotonic() - start, hit=False)
+            logger.info(f"Using in-process ALSA mixer for '{control}'")
+            return mixer
+        except (OSError, AttributeError) as e:
+            if mixer is not None:
+                mixer.close()
+            if backend == "alsa":
+                logger.error(f"ALSA mixer backend not available: {e}")
+                return None
+            logger.warning(f"ALSA mixer backend not available ({e}), falling back to amixer")
+
+    if not control and cached:
+        cache.measured("mixer_control", 0.0, hit=True)
+        logger.info(f"Using amixer subprocess for '{cached}' (cached)")
+        return AmixerMixer(cached)
+
+    discovered = control is None
+    start = time.monotonic()
+    control = control or get_available_audio_controls()
+    if control is None:
+        return None
+    if discovered and cache is not None:
+        cache.set("mixer_control", control)
+        cache.measured("mixer_control", time.monotonic() - start, hit=False)
+    logger.info(f"Using amixer subprocess for '{control}'")
+    return AmixerMixer(control)
+
+
+class StartupCache:
+    """Beim Start ermittelte Werte (hidraw-Knoten, Mixer-Control) für den nächsten Neustart
+
+    Jeder Eintrag wird vor der Verwendung geprüft; ungültige Einträge werden verworfen und
+    neu ermittelt. path=None schaltet den Cache ab (--no-cache).
+
+    Die Dauer der letzten Ermittlung ohne Cache wird mitgespeichert, damit der Startup-Report
+    die gemessene Prüfzeit eines Treffers damit vergleichen kann (siehe report()).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {}
+        self.dirty = False
+        self.timings = []  # (Schlüssel, Sekunden, Treffer) dieses Starts
+        if path:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == STARTUP_CACHE_VERSION:
+                    self.data = data
+            except (OSError, ValueError, AttributeError):
+                pass
+        self.data["version"] = STARTUP_CACHE_VERSION
+
+    def __bool__(self):
+        return self.path is not None
+
+    def get(self, key, validate=None):
+        value = self.data.get(key)
+        if value is not None and validate is not None and not validate(value):
+            logger.info(f"Cached {key} {value!r} is no longer valid")
+            self.discard(key)
+            return None
+        return value
+
+    def set(self, key, value):
+        if self.data.get(key) != value:
+            self.data[key] = value
+            self.dirty = True
+
+    def discard(self, key):
+        if self.data.pop(key, None) is not None:
+            self.dirty = True
+
+    def measured(self, key, seconds, hit):
+        """Merkt die Dauer der Prüfung (hit=True) bzw. der Ermittlung eines Eintrags"""
+        self.timings.append((key, seconds, hit))
+        if not hit and self.path:
+            discovery = self.data.get("discovery_ms")
+            if not isinstance(discovery, dict):
+                discovery = self.data["discovery_ms"] = {}
+            discovery[key] = round(seconds * 1000, 2)
+            self.dirty = True
+
+    def report(self):
+        """Gemessene Zeiten für den Startup-Report, z.B. 'mixer_control 0.1 ms cached vs. 38.0 ms discovered'"""
+        discovery = self.data.get("discovery_ms")
+        discovery = discovery if isinstance(discovery, dict) else {}
+        parts = []
+        for key, seconds, hit in self.timings:
+            if not hit:
+                parts.append(f"{key} {seconds * 1000:.1f} ms discovered")
+            elif key in discovery:
+                parts.append(f"{key} {seconds * 1000:.1f} ms cached vs. {discovery[key]:.1f} ms discovered")
+            else:
+                parts.append(f"{key} {seconds * 1000:.1f} ms cached")
+        return ", ".join(parts)
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=1)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+            logger.debug(f"Startup cache written to {self.path}")
+        except OSError as e:
+            logger.warning(f"Could not write startup cache {self.path}: {e}")
+
+
+def _process_start_ticks(pid="self", proc_dir=PROC_DIR):
+    """Startzeitpunkt eines Prozesses in Clock-Ticks seit dem Boot (unterscheidet wiederverwendete PIDs)"""
+    with open(os.path.join(proc_dir, str(pid), "stat")) as f:
+        # Feld 22 (starttime) steht hinter dem Programmnamen in Klammern
+        return int(f.read().rsplit(")", 1)[1].split()[19])
+
+
+def _process_age():
+    """Sekunden seit dem Start dieses Prozesses (inkl. Interpreter-Start) oder None"""
+    try:
+        start_ticks = _process_start_ticks()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTimer:
+    """Misst die Startphasen bis zum ersten wartenden HID-Read (Startup-Report)"""
+
+    def __init__(self, start=None):
+        self.start = time.monotonic() if start is None else start
+        self.phases = []
+        self._last = self.start
+
+    def mark(self, name, detail=None):
+        now = time.monotonic()
+        self.phases.append((name, now - self._last, detail))
+        self._last = now
+
+    def report(self, cache=None):
+        parts = [f"{name} {seconds * 1000:.0f} ms" + (f" ({detail})" if detail else "")
+                 for name, seconds, detail in self.phases]
+        total = time.monotonic() - self.start
+        age = _process_age()
+        since_exec = f", {age * 1000:.0f} ms after process start" if age is not None else ""
+        lookups = cache.report() if cache is not None else ""
+        lookups = f"; lookups: {lookups}" if lookups else ""
+        logger.info(f"Startup: {', '.join(parts)}; handling buttons {total * 1000:.0f} ms after import"
+                    f"{since_exec}{lookups}")
+
+
+class SatelliteInfo:
+    """Aus der Kommandozeile des wyoming-satellite gelesene Einstellungen"""
+
+    def __init__(self, pid, start_ticks, argv):
+        self.pid = pid
+        self.start_ticks = start_ticks
+        self.wake_word = None
+        self.api_uri = None
+        self.event_uri = None
+        self.uri = None
+
+        options = {"--wake-word-name": "wake_word", "--api-uri": "api_uri",
+                   "--event-uri": "event_uri", "--uri": "uri"}
+        for i, arg in enumerate(argv):
+            name, has_value, value = arg.partition("=")
+            if name in options:
+                if not has_value:
+                    value = argv[i + 1] if i + 1 < len(argv) else None
+                setattr(self, options[name], value)
+
+    @property
+    def api_base_url(self):
+        """Basis-URL der Web-API (…/api) aus --api-uri, 0.0.0.0 wird zu 127.0.0.1"""
+        if not self.api_uri:
+            return None
+        parsed = urllib.parse.urlsplit(self.api_uri)
+        if not parsed.hostname or not parsed.port:
+            return None
+        host = "127.0.0.1" if parsed.hostname in ("0.0.0.0", "::") else parsed.hostname
+        return f"http://{host}:{parsed.port}/api"
+
+    def __repr__(self):
+        return (f"SatelliteInfo(pid={self.pid}, wake_word={self.wake_word!r}, api_uri={self.api_uri!r}, "
+                f"event_uri={self.event_uri!r})")
+
+
+def _is_satellite_command(argv):
+    """Nur der Satellite selbst, nicht script/run, ein Editor oder "grep wyoming-satellite"
+
+    Erkannt werden 'python -m wyoming_satellite …' und ein direkt gestartetes Entry-Point-Skript.
+    """
+    program = os.path.basename(argv[0])
+    if program in SATELLITE_PROCESS_NAMES:
+        return True
+    if not program.startswith("python") or len(argv) < 2:
+        return False
+    if argv[1] == "-m":
+        return len(argv) > 2 and argv[2] in SATELLITE_PROCESS_NAMES
+    return os.path.basename(argv[1]) in SATELLITE_PROCESS_NAMES
+
+
+def find_satellite_process(proc_dir=PROC_DIR):
+    """Sucht den wyoming-satellite in /proc/*/cmdline (ohne ps-Aufrufe); SatelliteInfo oder None"""
+    try:
+        entries = os.scandir(proc_dir)
+    except OSError as e:
+        logger.debug(f"Cannot scan {proc_dir}: {e}")
+        return None
+
+    with entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
             try:
-                out = subprocess.check_output(cmd, shell=True, text=True)
-                if out.strip():
-                    # Versuche, den Wake-Word-Namen zu extrahieren
-                    match = re.search(r"--wake-word-name[= ]([\w-]+)", out)
-                    if match:
-                        wake_word = match.group(1)
-                        logger.info(f"Found wake word: {wake_word}")
-                        return wake_word
-                    else:
-                        logger.warning(f"Wyoming-satellite process found but no wake-word-name argument detected")
-            except subprocess.CalledProcessError:
+                with open(os.path.join(entry.path, "cmdline"), "rb") as f:
+                    cmdline = f.read()
+                if not any(name.encode() in cmdline for name in SATELLITE_PROCESS_NAMES):
+                    continue
+                argv = cmdline.decode(errors="replace").rstrip("\0").split("\0")
+                if not _is_satellite_command(argv):
+                    continue
+                return SatelliteInfo(int(entry.name), _process_start_ticks(entry.name, proc_dir), argv)
+            except (OSError, ValueError, IndexError):
+                # Prozess ist inzwischen beendet oder nicht lesbar
                 continue
-        
-        logger.warning("Could not find Wyoming Satellite process, using default wake word")
-    except Exception as e:
-        logger.error(f"Error determining Wake Word: {e}")
-        
-    default_wake_word = "jarvis"    
-    logger.warning(f"Using default wake word: {default_wake_word}")
-    return default_wake_word  # Fallback
+    return None
+
+
+class SatelliteDiscovery:
+    """Merkt sich den gefundenen wyoming-satellite und sucht erst neu, wenn dieser Prozess endet
+
+    refresh() prüft nur, ob die gemerkte PID mit demselben Startzeitpunkt noch existiert;
+    ein vollständiger Scan von /proc findet nur nach einem Neustart des Satellites statt.
+    on_change(info) wird mit dem neuen SatelliteInfo (oder None) aufgerufen.
+    """
+
+    def __init__(self, proc_dir=PROC_DIR, on_change=None):
+        self.proc_dir = proc_dir
+        self.on_change = on_change
+        self.info = None
+        self.scans = 0
+
+    def _still_running(self):
+        try:
+            return _process_start_ticks(self.info.pid, self.proc_dir) == self.info.start_ticks
+        except (OSError, ValueError, IndexError):
+            return False
+
+    def refresh(self):
+        """Aktualisiert self.info; gibt True zurück, wenn sich der Satellite-Prozess geändert hat"""
+        if self.info is not None and self._still_running():
+            return False
+
+        self.scans += 1
+        previous = self.info
+        self.info = find_satellite_process(self.proc_dir)
+        if previous is None and self.info is None:
+            return False
+
+        if self.info is None:
+            logger.info(f"Wyoming satellite (PID {previous.pid}) is no longer running")
+        else:
+            logger.info(f"Found wyoming satellite: {self.info}")
+        if self.on_change is not None:
+            self.on_change(self.info)
+        return True
+
+    async def watch(self, interval=SATELLITE_WATCH_INTERVAL):
+        """Prüft alle `interval` Sekunden auf einen Neustart des Satellites (als Task, cancel zum Beenden)"""
+        while True:
+            await asyncio.sleep(interval)
+            self.refresh()
+
+
+class CircuitOpenError(Exception):
+    """Die Wyoming-API gilt als nicht erreichbar; der Aufruf wurde gar nicht erst gesendet"""
+
+
+class CircuitBreaker:
+    """Einfacher Circuit Breaker für die Wyoming-API
+
+    Nach `failure_threshold` Fehlern in Folge wird der Kreis geöffnet und alle Aufrufe schlagen
+    sofort fehl. Nach `reset_timeout` Sekunden wird ein einzelner Probeaufruf durchgelassen
+    (half-open); ist er erfolgreich, schließt der Kreis wieder.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=5.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """Prüft, ob ein Aufruf gesendet werden darf"""
+        if self.opened_at is None:
+            return True
+        if not self._probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("Wyoming API reachable again, closing circuit")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+            if not self._probing:
+                logger.warning(f"Wyoming API failed {self.failures} times in a row, "
+                               f"pausing requests for {self.reset_timeout:.0f}s")
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class CallStats:
+    """Latenzstatistik eines API-Endpunkts"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, seconds, ok=True):
+        self.count += 1
+        if not ok:
+            self.errors += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    def __str__(self):
+        avg = self.total / self.count if self.count else 0.0
+        return (f"{self.count} calls, {self.errors} errors, "
+                f"avg {avg * 1000:.1f} ms, max {self.max * 1000:.1f} ms, last {self.last * 1000:.1f} ms")
+
+
+class WyomingApiClient:
+    """HTTP-Client für die Wyoming-Satellite-Web-API mit Keep-Alive-Verbindung und Circuit Breaker"""
+
+    def __init__(self, base_url, connect_timeout=API_CONNECT_TIMEOUT, read_timeout=API_READ_TIMEOUT,
+                 breaker=None):
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker or CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        self.stats = {}
+        _load_requests()
+
+        # Eine wiederverwendete Verbindung statt eines neuen TCP-Handshakes pro Aufruf.
+        # Ein Retry nur für Verbindungsfehler, z.B. wenn eine Keep-Alive-Verbindung nach einem
+        # Neustart des Satellites nicht mehr gültig ist.
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method, endpoint, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Wyoming API unavailable, skipping {method} {endpoint}")
+
+        stats = self.stats.setdefault(f"{method} {endpoint}", CallStats())
+        start = time.monotonic()
+        try:
+            response = self.session.request(method, f"{self.base_url}{endpoint}", timeout=self.timeout, **kwargs)
+        except Exception:
+            # Nicht nur RequestException (z.B. ValueError bei einer kaputten Basis-URL): sonst bliebe
+            # ein Probeaufruf des Circuit Breakers offen und der Kreis dauerhaft half-open
+            stats.record(time.monotonic() - start, ok=False)
+            metrics.inc("api_errors")
+            self.breaker.record_failure()
+            raise
+
+        elapsed = time.monotonic() - start
+        ok = response.status_code < 500
+        stats.record(elapsed, ok=ok)
+        metrics.observe(f"api_{endpoint.strip('/')}", elapsed)
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        logger.debug("%s %s -> HTTP %s in %.1f ms", method, endpoint, response.status_code, elapsed * 1000)
+        return response
+
+    def status(self):
+        return self._request("GET", "/status")
+
+    def cancel(self):
+        return self._request("POST", "/cancel")
+
+    def trigger_wake(self, wake_word=None):
+        # POST /api/trigger-wake; wake_word_name ist optional
+        return self._request("POST", "/trigger-wake", json={"wake_word_name": wake_word} if wake_word else {})
+
+    def log_stats(self):
+        for name, stats in sorted(self.stats.items()):
+            logger.info(f"Wyoming API {name}: {stats}")
+
+    def close(self):
+        self.session.close()
+
+
+def _load_requests():
+    """Importiert requests beim ersten Gebrauch (auf einem Pi Zero ein spürbarer Teil der Startzeit)"""
+    global requests
+    if requests is None:
+        import requests.adapters
+    return requests
+
+
+def get_api_client():
+    """Liefert den gemeinsamen API-Client (wird beim ersten Aufruf angelegt)
+
+    Hat sich die Basis-URL geändert (Satellite mit anderer --api-uri neu gestartet), wird der
+    alte Client samt seiner Keep-Alive-Session geschlossen und ein neuer angelegt.
+    """
+    global _api_client
+    with _api_client_lock:
+        if _api_client is not None and _api_client.base_url != WYOMING_API_BASE_URL:
+            logger.info(f"Wyoming API moved from {_api_client.base_url} to {WYOMING_API_BASE_URL}")
+            _api_client.log_stats()
+            _api_client.close()
+            _api_client = None
+        if _api_client is None:
+            _api_client = WyomingApiClient(WYOMING_API_BASE_URL)
+        return _api_client
+
+
+def connect_uri(uri, timeout=None):
+    """Öffnet eine Socket-Verbindung zu einer tcp:// oder unix:// URI"""
+    parsed = urllib.parse.urlparse(uri)
+    if parsed.scheme == "tcp":
+        return socket.create_connection((parsed.hostname, parsed.port), timeout=timeout)
+    if parsed.scheme == "unix":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(parsed.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+    raise ValueError(f"Only 'tcp://' and 'unix://' URIs are supported: {uri}")
+
+
+def read_wyoming_event(stream):
+    """Liest ein Wyoming-Event (JSON-Kopfzeile + optionale Daten/Payload) aus einem Datei-Objekt
+
+    Gibt (type, data, payload) zurück oder None, wenn der Stream geschlossen wurde.
+    """
+    line = stream.readline()
+    if not line:
+        return None
+
+    header = json.loads(line)
+    data = header.get("data") or {}
+    data_length = header.get("data_length") or 0
+    if data_length > 0:
+        data.update(json.loads(stream.read(data_length)))
+
+    payload = None
+    payload_length = header.get("payload_length") or 0
+    if payload_length > 0:
+        payload = stream.read(payload_length)
+
+    return header["type"], data, payload
+
+
+class SatelliteStateMirror:
+    """Spiegelt den Satellite-Zustand aus dem Event-Stream des LED-Service (--state-uri)
+
+    Solange die Verbindung steht, entscheidet toggle_satellite_state() lokal zwischen Cancel und
+    Wake und braucht nur einen API-Aufruf. Ist der Zustand unbekannt oder veraltet, wird wie
+    bisher /status abgefragt.
+
+    Mit uri=None gibt es keine Verbindung: Der LED-Service im selben Prozess (voice_mini.py)
+    übergibt die Event-Typen direkt an handle_event().
+    """
+
+    def __init__(self, uri, max_active_age=STATE_MIRROR_MAX_ACTIVE_AGE):
+        self.uri = uri
+        self.max_active_age = max_active_age
+        self.connected = uri is None
+        self.active = None
+        self.state = None
+        self.updated_at = 0.0
+        self.event_at = 0.0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._sock = None
+        self._thread = None
+
+        if uri is not None:
+            self._thread = threading.Thread(target=self._run, name="s330-state-mirror", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                self._sock = connect_uri(self.uri)
+                self.connected = True
+                backoff = 0.5
+                logger.info(f"Connected to satellite state stream at {self.uri}")
+
+                with self._sock.makefile("rb") as stream:
+                    while not self._stop.is_set():
+                        event = read_wyoming_event(stream)
+                        if event is None:
+                            break
+                        self.handle_event(event[0])
+            except (OSError, ValueError) as e:
+                logger.debug(f"Satellite state stream unavailable: {e}")
+            finally:
+                if self.connected and not self._stop.is_set():
+                    logger.warning("Lost satellite state stream, falling back to /status")
+                with self._lock:
+                    self.connected = False
+                    self.active = None
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 5.0)
+
+    def handle_event(self, event_type):
+        active = SATELLITE_STATE_EVENTS.get(event_type)
+        if active is None:
+            return
+        logger.debug("Satellite state event: %s (active: %s)", event_type, active)
+        self.set_active(active, event_type, from_event=True)
+
+    def set_active(self, active, state, from_event=False):
+        """Setzt den Zustand (aus einem Event oder nach einem erfolgreichen API-Aufruf)"""
+        with self._changed:
+            self.active = active
+            self.state = state
+            self.updated_at = time.monotonic()
+            if from_event:
+                self.event_at = self.updated_at
+                self._changed.notify_all()
+
+    def wait_for_event(self, active, since, timeout):
+        """Wartet, bis ein Event nach `since` den Zustand `active` meldet; False nach Ablauf von timeout"""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.event_at >= since and self.active == active, timeout)
+
+    def is_active(self):
+        """True/False aus dem gespiegelten Zustand oder None, wenn er unbekannt oder veraltet ist"""
+        with self._lock:
+            if not self.connected or self.active is None:
+                return None
+            if self.active and time.monotonic() - self.updated_at > self.max_active_age:
+                return None
+            return self.active
+
+    def close(self):
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
 
 def toggle_satellite_state():
     """Schaltet den Wyoming Satellite zwischen den Zuständen um.
@@ -99,49 +1031,63 @@ def toggle_satellite_state():
     Wenn der Satellite gerade aktiv ist (hört oder streamt Audio), wird er abgebrochen.
     Wenn er inaktiv ist, wird ein Wakeword ausgelöst.    
     """
+    client = get_api_client()
     try:
-        # Prüfe den aktuellen Status des Satellites über die Web-API
-        response = requests.get(f"{WYOMING_API_BASE_URL}/status", timeout=2)
-        if response.status_code != 200:
-            logger.error(f"Failed to get satellite status: HTTP {response.status_code}")
-            return
-            
-        status = response.json()
-        logger.debug(f"Current satellite status: {status}")
+        # Zustand bevorzugt aus dem gespiegelten Event-Stream, sonst über /status
+        active = _state_mirror.is_active() if _state_mirror else None
+        if active is not None:
+            logger.debug("Satellite state from event stream: %s", _state_mirror.state)
+        else:
+            # Prüfe den aktuellen Status des Satellites über die Web-API
+            response = client.status()
+            if response.status_code != 200:
+                logger.error(f"Failed to get satellite status: HTTP {response.status_code}")
+                return
+                
+            status = response.json()
+            logger.debug("Current satellite status: %s", status)
+            active = status.get("is_active", False) or status.get("state", "idle") != "idle"
         
         # Entscheide basierend auf dem Status, was zu tun ist
-        if status.get("is_active", False) or status.get("state", "idle") != "idle":
+        if active:
             # Satellite ist aktiv, sende cancel
             logger.info("Satellite is active, sending cancel request")
-            cancel_response = requests.post(f"{WYOMING_API_BASE_URL}/cancel", timeout=2)
+            if send_control_event("cancel"):
+                logger.info("Cancel event sent via Wyoming")
+                if _state_mirror:
+                    _state_mirror.set_active(False, "cancel")
+                return
+
+            cancel_response = client.cancel()
             if cancel_response.status_code == 200:
                 logger.info("Cancel request successful")
+                if _state_mirror:
+                    _state_mirror.set_active(False, "cancel")
             else:
                 logger.error(f"Cancel request failed: HTTP {cancel_response.status_code}")
         else:
             # Satellite ist inaktiv, sende trigger-wake
             logger.info("Satellite is idle, triggering wake word")
+            if send_control_event("trigger_wake"):
+                logger.info("Wake word trigger sent via Wyoming")
+                if _state_mirror:
+                    _state_mirror.set_active(True, "trigger-wake")
+                return
             
-            # Verwende den korrekten Endpunkt aus der Dokumentation
             try:
-                # POST /api/trigger-wake
-                data = {}  # Leerer Request-Body, wake_word_name ist optional
-                headers = {"Content-Type": "application/json"}
-                
-                trigger_response = requests.post(
-                    f"{WYOMING_API_BASE_URL}/trigger-wake", 
-                    json=data,
-                    headers=headers,
-                    timeout=2
-                )
+                trigger_response = client.trigger_wake(WAKE_WORD)
                 
                 if trigger_response.status_code == 200:
                     logger.info("Wake word trigger successful")
+                    if _state_mirror:
+                        _state_mirror.set_active(True, "trigger-wake")
                 else:
                     logger.error(f"Wake word trigger failed: HTTP {trigger_response.status_code}")
             except requests.exceptions.RequestException as e:
                 logger.error(f"Wake word trigger failed: {e}")
     
+    except CircuitOpenError as e:
+        logger.warning(str(e))
     except requests.exceptions.RequestException as e:
         logger.error(f"Error communicating with Wyoming Satellite API: {e}")
     except Exception as e:
@@ -154,92 +1100,1226 @@ def force_activate_satellite():
     Diese Funktion verwendet die Web-API, um den Satellite direkt zu aktivieren.
     (Alias für direkten API-Aufruf, für Kompatibilität mit bestehendem Code)
     """
+    # Für die except-Klauseln unten, auch wenn nur die Wyoming-Verbindung benutzt wird
+    _load_requests()
     try:
         # Direkte Aktivierung des Satellites über die Web-API mit trigger-wake
+        if send_control_event("trigger_wake"):
+            logger.info("Satellite Aktivierung über Wyoming gesendet")
+            return
+
         logger.info("Aktiviere Wyoming Satellite direkt über Web-API")
         
-        data = {}  # Leerer Request-Body, wake_word_name ist optional
-        headers = {"Content-Type": "application/json"}
-        
-        response = requests.post(
-            f"{WYOMING_API_BASE_URL}/trigger-wake", 
-            json=data,
-            headers=headers,
-            timeout=2
-        )
+        response = get_api_client().trigger_wake(WAKE_WORD)
         
         if response.status_code == 200:
             logger.info("Satellite Aktivierung erfolgreich")
         else:
             logger.error(f"Satellite Aktivierung fehlgeschlagen: HTTP {response.status_code}")
             
+    except CircuitOpenError as e:
+        logger.warning(str(e))
     except requests.exceptions.RequestException as e:
         logger.error(f"Fehler bei der Kommunikation mit Wyoming Satellite API: {e}")
     except Exception as e:
         logger.error(f"Unerwarteter Fehler bei der Satellite Aktivierung: {e}")
 
-def send_wyoming_message(sock, protocol_header, message):
-    """Hilfsfunktion zum Senden von Wyoming-Nachrichten"""
-    # Konvertiere das Message-Objekt in JSON
-    data_json = json.dumps(message)
-    data_bytes = data_json.encode("utf-8")
-    
-    # Länge und reservierte Bytes im WYOMING-Protokoll
-    length = len(data_bytes).to_bytes(4, byteorder="big")
-    reserved = b"\x00" * 4
-    
-    # Paket zusammensetzen
-    packet = protocol_header + length + reserved + data_bytes
-    
+def cancel_satellite():
+    """Bricht eine laufende Sprachsitzung ab (ohne vorherige Statusabfrage)"""
+    _load_requests()
+    try:
+        if send_control_event("cancel"):
+            logger.info("Cancel event sent via Wyoming")
+        else:
+            response = get_api_client().cancel()
+            if response.status_code != 200:
+                logger.error(f"Cancel request failed: HTTP {response.status_code}")
+                return
+            logger.info("Cancel request successful")
+
+        if _state_mirror:
+            _state_mirror.set_active(False, "cancel")
+    except CircuitOpenError as e:
+        logger.warning(str(e))
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error communicating with Wyoming Satellite API: {e}")
+    except Exception as e:
+        logger.error(f"Unexpected error in cancel_satellite: {e}")
+
+
+def encode_wyoming_event(event_type, data=None):
+    """Serialisiert ein Wyoming-Event einmalig zu (Kopfzeile, Daten) als Bytes"""
+    header = {"type": event_type, "version": WYOMING_PROTOCOL_VERSION}
+    data_bytes = b""
+    if data:
+        data_bytes = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        header["data_length"] = len(data_bytes)
+    return json.dumps(header).encode("utf-8") + b"\n", data_bytes
+
+
+def send_wyoming_message(sock, protocol_header, message=b""):
+    """Hilfsfunktion zum Senden von Wyoming-Nachrichten
+
+    `protocol_header` ist die vorab serialisierte JSON-Kopfzeile (siehe encode_wyoming_event),
+    `message` die zugehörigen Daten-Bytes bzw. ein Dict, das hier serialisiert wird.
+    """
+    if isinstance(message, dict):
+        # Kopfzeile mit passender data_length neu erzeugen
+        header = json.loads(protocol_header)
+        protocol_header, message = encode_wyoming_event(header["type"], message)
+
     # Daten senden
-    sock.sendall(packet)
+    sock.sendall(protocol_header + message)
 
 
-def setup_logging(log_level=logging.INFO, log_file=None):
-    """Konfiguriert das Logging-System"""
-    # Root-Logger konfigurieren
-    root_logger = logging.getLogger()
-    root_logger.setLevel(log_level)
-    
-    # Console-Handler
-    console = logging.StreamHandler()
-    console.setLevel(log_level)
-    console.setFormatter(log_format)
-    root_logger.addHandler(console)
-    
-    # Datei-Handler, falls eine Log-Datei angegeben wurde
-    if log_file:
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(log_level)
-        file_handler.setFormatter(log_format)
-        root_logger.addHandler(file_handler)
-    
-    return root_logger
+class WyomingControlClient:
+    """Hält eine Wyoming-Verbindung zum Satellite offen und sendet Trigger/Cancel als Events
 
-def main():
-    # Kommandozeilenargumente parsen
-    parser = argparse.ArgumentParser(description='Anker PowerConf S330 Button Monitor')
-    parser.add_argument('--debug', action='store_true', help='Enable debug logging')
-    parser.add_argument('--log-file', help='Path to log file')
-    parser.add_argument('--audio-control', help='Audio mixer control to use (e.g., Master, PCM, Speaker)')
-    parser.add_argument('--wake-word', help='Wake word to use when triggering (overrides auto-detection)')
-    parser.add_argument('--wyoming-api-host', default=WYOMING_API_HOST, help='Wyoming API host (default: 127.0.0.1)')
-    parser.add_argument('--wyoming-api-port', type=int, default=WYOMING_API_PORT, help='Wyoming API port (default: 8080)')
-    args = parser.parse_args()
-    
-    # Logging einrichten
-    log_level = logging.DEBUG if args.debug else logging.INFO
-    setup_logging(log_level, args.log_file)
-    
-    logger.info("Starting button monitoring for Anker PowerConf S330...")
-    
-    # Versuche zuerst, das hidapi-Modul zu importieren
-    try:
-        import hidapi
-        logger.info("Using hidapi module")
-        using_hid = False
-    except ImportError:
-        # Wenn hidapi nicht verfügbar ist, verwende hid
+    Die Events werden beim Start einmalig serialisiert, pro Tastendruck wird nur noch ein
+    vorbereiteter Bytestring gesendet. Bei Fehlern wird die Verbindung verworfen und beim
+    nächsten Aufruf (nach einer kurzen Pause) neu aufgebaut; der Aufrufer fällt dann auf die
+    HTTP-API zurück.
+    """
+
+    def __init__(self, uri, wake_word=None, connect_timeout=API_CONNECT_TIMEOUT,
+                 send_timeout=WYOMING_SEND_TIMEOUT, reconnect_delay=WYOMING_RECONNECT_DELAY):
+        self.uri = uri
+        self.connect_timeout = connect_timeout
+        self.send_timeout = send_timeout
+        self.reconnect_delay = reconnect_delay
+        self.stats = {}
+        self._sock = None
+        self._next_connect = 0.0
+
+        self._packets = {WYOMING_CANCEL_EVENT: b"".join(encode_wyoming_event(WYOMING_CANCEL_EVENT))}
+        self.set_wake_word(wake_word)
+
+    def set_wake_word(self, wake_word):
+        """Serialisiert das trigger-wake-Event neu (z.B. nach einem Neustart des Satellites)"""
+        trigger_data = {"wake_word_name": wake_word} if wake_word else None
+        self._packets[WYOMING_TRIGGER_EVENT] = b"".join(encode_wyoming_event(WYOMING_TRIGGER_EVENT, trigger_data))
+
+    def _connect(self):
+        if time.monotonic() < self._next_connect:
+            raise ConnectionError(f"Waiting before reconnecting to {self.uri}")
+
+        sock = connect_uri(self.uri, timeout=self.connect_timeout)
+        if sock.family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # sendall() blockiert höchstens send_timeout, falls die Gegenseite nicht mehr liest
+        sock.settimeout(self.send_timeout)
+        self._sock = sock
+        logger.info(f"Connected to Wyoming control URI {self.uri}")
+        return sock
+
+    def _drain(self, sock):
+        """Verwirft eingehende Events und erkennt eine geschlossene Verbindung vor dem Senden"""
+        while select.select([sock], [], [], 0)[0]:
+            if not sock.recv(4096):
+                raise ConnectionResetError("Wyoming control connection closed by peer")
+
+    def _send(self, event_type):
+        stats = self.stats.setdefault(event_type, CallStats())
+        start = time.monotonic()
+        try:
+            sock = self._sock or self._connect()
+            self._drain(sock)
+            send_wyoming_message(sock, self._packets[event_type])
+        except OSError:
+            stats.record(time.monotonic() - start, ok=False)
+            metrics.inc("wyoming_errors")
+            self.close()
+            self._next_connect = time.monotonic() + self.reconnect_delay
+            raise
+
+        elapsed = time.monotonic() - start
+        stats.record(elapsed)
+        metrics.observe(f"wyoming_{event_type}", elapsed)
+        logger.debug("Wyoming %s sent in %.2f ms", event_type, elapsed * 1000)
+
+    def trigger_wake(self):
+        self._send(WYOMING_TRIGGER_EVENT)
+
+    def cancel(self):
+        self._send(WYOMING_CANCEL_EVENT)
+
+    def log_stats(self):
+        for name, stats in sorted(self.stats.items()):
+            logger.info(f"Wyoming control {name}: {stats}")
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+def send_control_event(action):
+    """Sendet 'trigger_wake' oder 'cancel' über die Wyoming-Verbindung, falls konfiguriert
+
+    Ein erfolgreiches Senden heißt nicht, dass der Satellite das Event kennt. Mit gespiegeltem
+    Zustand wird daher auf den Zustandswechsel gewartet; bleibt er aus, wird die HTTP-API benutzt.
+    Ohne --state-uri lässt sich die Zustellung nicht prüfen (Warnung beim Start).
+    Gibt False zurück, wenn der Aufrufer die HTTP-API verwenden soll.
+    """
+    if _control_client is None:
+        return False
+    active = action == "trigger_wake"
+    # Ist der Satellite schon im Zielzustand (z.B. cancel im Leerlauf), kommt kein Event mehr
+    confirm = _state_mirror is not None and _state_mirror.connected and _state_mirror.is_active() != active
+    sent_at = time.monotonic()
+    try:
+        getattr(_control_client, action)()
+    except OSError as e:
+        logger.warning(f"Wyoming control connection failed ({e}), falling back to HTTP API")
+        return False
+
+    if not confirm or _state_mirror.wait_for_event(active, sent_at, WYOMING_CONFIRM_TIMEOUT):
+        return True
+    metrics.inc("wyoming_unconfirmed")
+    logger.warning(f"Satellite did not react to Wyoming {action} within {WYOMING_CONFIRM_TIMEOUT * 1000:.0f} ms, "
+                   "falling back to HTTP API")
+    return False
+
+
+def _hidraw_matches(uevent_path, vid=VID, pid=PID):
+    """Prüft, ob die uevent-Datei eines hidraw-Knotens zu VID/PID gehört"""
+    try:
+        with open(uevent_path) as f:
+            uevent = f.read()
+    except OSError:
+        return False
+
+    # Zeile im Format 'HID_ID=0003:0000291A:00003308' (Bus:Vendor:Product)
+    for line in uevent.splitlines():
+        if line.startswith("HID_ID="):
+            try:
+                _bus, v_id, p_id = line[len("HID_ID="):].split(":")
+                return int(v_id, 16) == vid and int(p_id, 16) == pid
+            except ValueError:
+                logger.debug(f"Unexpected HID_ID line in {uevent_path}: {line}")
+                return False
+    return False
+
+
+def find_hidraw_devices(vid=VID, pid=PID):
+    """Sucht die /dev/hidraw*-Knoten der Anker S330 über sysfs (ohne hidapi)"""
+    paths = []
+    for uevent_path in sorted(glob.glob(os.path.join(HIDRAW_SYSFS_DIR, "hidraw*", "device", "uevent"))):
+        if _hidraw_matches(uevent_path, vid, pid):
+            node = uevent_path.split(os.sep)[-3]
+            paths.append(os.path.join("/dev", node))
+
+    logger.debug(f"hidraw nodes for {vid:04x}:{pid:04x}: {paths}")
+    return paths
+
+
+def hidraw_paths_valid(paths, vid=VID, pid=PID):
+    """Ob gecachte /dev/hidraw*-Knoten noch existieren und noch zur S330 gehören"""
+    return bool(paths) and all(
+        os.path.exists(path)
+        and _hidraw_matches(os.path.join(HIDRAW_SYSFS_DIR, os.path.basename(path), "device", "uevent"), vid, pid)
+        for path in paths
+    )
+
+
+def describe_open_error(paths, error):
+    """Fehlermeldung für nicht zu öffnende hidraw-Knoten, bei fehlenden Rechten mit Hinweis auf udev"""
+    message = f"Could not open {', '.join(paths)}: {error}"
+    if error.errno in (errno.EACCES, errno.EPERM):
+        message += (f". Run as root or add a udev rule, e.g. KERNEL==\"hidraw*\", ATTRS{{idVendor}}==\"{VID:04x}\", "
+                    f"ATTRS{{idProduct}}==\"{PID:04x}\", MODE=\"0660\", GROUP=\"plugdev\"")
+    return message
+
+
+class DeviceAccessError(Exception):
+    """Die S330 ist angesteckt, ihre hidraw-Knoten lassen sich aber dauerhaft nicht öffnen"""
+
+
+class HidrawReader:
+    """Blockiert per poll() auf den hidraw-Dateideskriptoren, bis ein Report ankommt.
+
+    Im Leerlauf entstehen dadurch keine Wakeups, und ein Report wird sofort nach
+    dem Eintreffen gelesen.
+    """
+
+    def __init__(self, paths):
+        self.fds = []
+        self.poller = select.poll()
+        try:
+            for path in paths:
+                fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+                self.fds.append(fd)
+                self.poller.register(fd, select.POLLIN)
+        except OSError:
+            self.close()
+            raise
+
+    def read(self, timeout=None):
+        """Liefert den nächsten Report oder None, wenn der Timeout (Sekunden) abgelaufen ist"""
+        events = self.poller.poll(None if timeout is None else timeout * 1000)
+        for fd, mask in events:
+            if mask & (select.POLLERR | select.POLLHUP | select.POLLNVAL):
+                raise OSError(f"hidraw device error (poll mask {mask:#x})")
+            try:
+                return os.read(fd, HID_REPORT_SIZE)
+            except BlockingIOError:
+                continue
+        return None
+
+    async def read_async(self):
+        """Wartet über die Event-Loop (epoll) auf den nächsten Report"""
+        loop = asyncio.get_running_loop()
+        while True:
+            data = self.read(timeout=0)
+            if data is not None:
+                return data
+
+            ready = loop.create_future()
+            for fd in self.fds:
+                loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+            try:
+                await ready
+            finally:
+                for fd in self.fds:
+                    loop.remove_reader(fd)
+
+    def close(self):
+        for fd in self.fds:
+            try:
+                self.poller.unregister(fd)
+            except (KeyError, ValueError):
+                pass
+            os.close(fd)
+        self.fds = []
+
+
+class UeventMonitor:
+    """Empfängt die Kernel-uevents (NETLINK_KOBJECT_UEVENT) des Subsystems hidraw
+
+    Braucht weder udev noch pyudev; der Socket ist nur offen, solange auf das Gerät gewartet wird.
+    """
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM | socket.SOCK_NONBLOCK | socket.SOCK_CLOEXEC,
+                                  NETLINK_KOBJECT_UEVENT)
+        try:
+            # Multicast-Gruppe 1: Events direkt vom Kernel (Gruppe 2 wären die von udev)
+            self.sock.bind((0, 1))
+        except OSError:
+            self.sock.close()
+            raise
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def read_events(self):
+        """Liefert alle anstehenden hidraw-Events als (Aktion, Gerätename)"""
+        events = []
+        while True:
+            try:
+                data = self.sock.recv(8192)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                # ENOBUFS: Events sind verloren gegangen, der Aufrufer soll neu suchen
+                logger.debug(f"uevent socket: {e}")
+                events.append(("add", None))
+                break
+            # "add@/devices/...\0ACTION=add\0SUBSYSTEM=hidraw\0DEVNAME=hidraw3\0..."
+            values = dict(field.split(b"=", 1) for field in data.split(b"\0")[1:] if b"=" in field)
+            if values.get(b"SUBSYSTEM") == b"hidraw":
+                events.append((values.get(b"ACTION", b"").decode(), values.get(b"DEVNAME", b"").decode()))
+        return events
+
+    def close(self):
+        self.sock.close()
+
+
+class HotplugHidrawReader:
+    """HidrawReader, der die S330 nach dem Ab- und Wieder-Anstecken im laufenden Prozess neu öffnet
+
+    Ein Lesefehler (POLLHUP/POLLERR beim Abziehen) pausiert das Lesen: on_disconnect() wird
+    aufgerufen, dann wartet read_async() auf ein add-Event des Kernels und öffnet die per sysfs
+    gefundenen Knoten, sobald deren Menge HOTPLUG_SETTLE_TIME lang gleich geblieben ist (sonst
+    bliebe es beim ersten Interface). Ohne Gerät beim Start (paths leer) wird genauso gewartet. Solange das Gerät steckt, kostet das nichts zusätzlich.
+
+    Gewartet wird nur auf fehlende Knoten: lassen sich vorhandene Knoten HOTPLUG_RETRY_TIME lang
+    nicht öffnen (meist fehlende Rechte), löst read_async() DeviceAccessError aus.
+    """
+
+    def __init__(self, paths=None, on_connect=None, on_disconnect=None):
+        self.paths = list(paths or [])
+        self.on_connect = on_connect  # (paths) nach dem Wieder-Öffnen
+        self.on_disconnect = on_disconnect
+        self.reconnects = 0
+        self.open_error = None  # (Knoten, OSError) des letzten fehlgeschlagenen Öffnens
+        self.reader = HidrawReader(self.paths) if self.paths else None
+
+    def _open(self, paths):
+        self.open_error = None
+        if not paths:
+            return False
+        try:
+            self.reader = HidrawReader(paths)
+        except OSError as e:
+            logger.debug(f"Could not open {', '.join(paths)} yet: {e}")
+            self.open_error = (paths, e)
+            return False
+        self.paths = paths
+        return True
+
+    async def _settled_paths(self):
+        """Sucht die hidraw-Knoten erneut, bis sich ihre Menge HOTPLUG_SETTLE_TIME lang nicht ändert"""
+        paths = find_hidraw_devices()
+        changed_at = time.monotonic()
+        deadline = changed_at + HOTPLUG_RETRY_TIME
+        while time.monotonic() - changed_at < HOTPLUG_SETTLE_TIME and time.monotonic() < deadline:
+            await asyncio.sleep(HOTPLUG_RETRY_DELAY)
+            current = find_hidraw_devices()
+            if current != paths:
+                paths = current
+                changed_at = time.monotonic()
+        return paths
+
+    async def _hidraw_added(self, monitor):
+        """Wartet, bis der Kernel ein neues hidraw-Gerät meldet"""
+        loop = asyncio.get_running_loop()
+        while True:
+            ready = loop.create_future()
+            loop.add_reader(monitor.fileno(), lambda: ready.done() or ready.set_result(None))
+            try:
+                await ready
+            finally:
+                loop.remove_reader(monitor.fileno())
+            for action, name in monitor.read_events():
+                if action == "add":
+                    logger.debug(f"hidraw device added: {name}")
+                    return
+
+    async def _wait_for_device(self):
+        try:
+            monitor = UeventMonitor()
+        except OSError as e:
+            monitor = None
+            logger.warning(f"No uevent socket ({e}), looking for the S330 every {HOTPLUG_RESCAN_INTERVAL:g}s")
+
+        try:
+            retry_until = None
+            # Erst nach dem Öffnen des Sockets suchen, damit kein add-Event dazwischen verloren geht
+            while not self._open(await self._settled_paths()):
+                if self.open_error is not None:
+                    # Knoten existiert, udev hat die Zugriffsrechte evtl. noch nicht gesetzt
+                    if retry_until is None:
+                        retry_until = time.monotonic() + HOTPLUG_RETRY_TIME
+                    elif time.monotonic() >= retry_until:
+                        raise DeviceAccessError(describe_open_error(*self.open_error))
+                    await asyncio.sleep(HOTPLUG_RETRY_DELAY)
+                    continue
+                retry_until = None
+                if monitor is None:
+                    await asyncio.sleep(HOTPLUG_RESCAN_INTERVAL)
+                else:
+                    await self._hidraw_added(monitor)
+        finally:
+            if monitor is not None:
+                monitor.close()
+
+    async def read_async(self):
+        while True:
+            if self.reader is None:
+                lost_at = time.monotonic()
+                await self._wait_for_device()
+                self.reconnects += 1
+                logger.info(f"S330 connected on {', '.join(self.paths)} after {time.monotonic() - lost_at:.3f}s")
+                metrics.observe_since("reconnect", lost_at)
+                if self.on_connect is not None:
+                    self.on_connect(self.paths)
+            try:
+                return await self.reader.read_async()
+            except OSError as e:
+                logger.warning(f"S330 disconnected ({e}), waiting for it to be plugged in again")
+                self.reader.close()
+                self.reader = None
+                if self.on_disconnect is not None:
+                    self.on_disconnect()
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+class ReadErrorBackoff:
+    """Wartezeit nach Lesefehlern eines Readers, verdoppelt sich bis READ_ERROR_MAX_DELAY
+
+    Der Reader wartet selbst, bevor er das Gerät erneut liest, statt die Fehler an
+    _read_reports weiterzureichen: so stauen sich keine Fehler vor den nächsten Reports,
+    und ein erfolgreicher Lesevorgang setzt die Wartezeit sofort zurück.
+    """
+
+    def __init__(self, initial=READ_ERROR_DELAY, maximum=READ_ERROR_MAX_DELAY):
+        self.initial = initial
+        self.maximum = maximum
+        self.delay = initial
+
+    def failed(self, error):
+        """Loggt den Fehler und liefert die Wartezeit bis zum nächsten Versuch"""
+        delay = self.delay
+        self.delay = min(delay * 2, self.maximum)
+        metrics.inc("read_errors")
+        logger.error(f"Error reading from the S330: {error} (retrying in {delay:g}s)")
+        return delay
+
+    def succeeded(self):
+        self.delay = self.initial
+
+
+class ThreadedReader:
+    """Liest in einem eigenen Thread blockierend über hid/hidapi und reicht die Reports an die Event-Loop weiter
+
+    Der Thread startet mit dem ersten read_async(), damit die Reports direkt in der Queue der Event-Loop landen.
+    """
+
+    def __init__(self, device, using_hid, timeout_ms=1000):
+        self.device = device
+        self.using_hid = using_hid
+        self.timeout_ms = timeout_ms
+        self._stop = threading.Event()
+        self._backoff = ReadErrorBackoff()
+        self._loop = None
+        self._queue = None
+        self._thread = None
+
+        if using_hid:
+            device.set_nonblocking(False)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Langer Timeout, damit der Thread regelmäßig das Stop-Flag prüfen kann
+                if self.using_hid:
+                    data = self.device.read(HID_REPORT_SIZE, self.timeout_ms)
+                else:
+                    data = self.device.read(HID_REPORT_SIZE, timeout_ms=self.timeout_ms)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                # Im Thread warten (durch close() abbrechbar), nicht in der Event-Loop
+                if self._stop.wait(self._backoff.failed(e)):
+                    break
+                continue
+
+            self._backoff.succeeded()
+            if data:
+                self._loop.call_soon_threadsafe(self._queue.put_nowait, data)
+
+    async def read_async(self):
+        """Liefert den nächsten Report; der Thread übergibt ihn direkt an die Event-Loop"""
+        if self._thread is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue()
+            self._thread = threading.Thread(target=self._run, name="s330-hid-reader", daemon=True)
+            self._thread.start()
+
+        return await self._queue.get()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=(self.timeout_ms / 1000) + 0.5)
+        self.device.close()
+
+
+class PollingReader:
+    """Bisheriger Lesemodus: kurzes Polling mit Pause (Fallback)"""
+
+    def __init__(self, device, using_hid):
+        self.device = device
+        self.using_hid = using_hid
+        self._backoff = ReadErrorBackoff()
+
+    def read(self, timeout=None):
+        if self.using_hid:
+            # Mit hid-Paket (nicht blockierend geöffnet)
+            data = self.device.read(HID_REPORT_SIZE)
+        else:
+            # Mit hidapi-Paket
+            try:
+                data = self.device.read(HID_REPORT_SIZE, timeout_ms=100)
+            except Exception as e:
+                logger.debug(f"Error reading data: {e}")
+                time.sleep(0.1)
+                return None
+
+        if not data:
+            # Kurze Pause
+            time.sleep(0.05)
+        return data
+
+    async def read_async(self):
+        while True:
+            try:
+                data = await asyncio.to_thread(self.read)
+            except Exception as e:
+                await asyncio.sleep(self._backoff.failed(e))
+                continue
+            self._backoff.succeeded()
+            if data:
+                return data
+
+    def close(self):
+        self.device.close()
+
+
+class TraceRecorder:
+    """Schreibt empfangene HID-Reports als JSON-Zeilen mit relativem Zeitstempel (--record)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = open(path, "w", encoding="utf-8", buffering=1)
+        self._start = None
+
+    def write(self, timestamp, data):
+        if self._start is None:
+            self._start = timestamp
+        self._file.write(json.dumps({"t": round(timestamp - self._start, 6), "data": bytes(data).hex()}) + "\n")
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+        logger.info(f"Recorded {self.count} reports to {self.path}")
+
+
+def load_trace(path):
+    """Liest eine Aufzeichnung von TraceRecorder: Liste von (Sekunden, Report-Bytes)"""
+    reports = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                reports.append((float(entry["t"]), bytes.fromhex(entry["data"])))
+    return reports
+
+
+class ReplayReader:
+    """Spielt eine Aufzeichnung statt eines Geräts ab (--replay)
+
+    `speed` skaliert die Pausen zwischen den Reports (2 = doppelt so schnell, 0 = ohne Pausen);
+    die Gestenerkennung sieht die Reports zu den abgespielten Zeitpunkten. Am Ende wird
+    on_finished aufgerufen, danach kommen keine Reports mehr.
+    """
+
+    def __init__(self, path, speed=1.0, on_finished=None):
+        self.path = path
+        self.reports = load_trace(path)
+        self.speed = speed
+        self.on_finished = on_finished
+        self._index = 0
+        self._start = None
+
+    async def read_async(self):
+        if self._index >= len(self.reports):
+            if self.on_finished is not None:
+                self.on_finished()
+                self.on_finished = None
+            await asyncio.Event().wait()
+
+        offset, data = self.reports[self._index]
+        if self._start is None:
+            self._start = time.monotonic() - (offset / self.speed if self.speed > 0 else 0.0)
+        if self.speed > 0:
+            delay = self._start + offset / self.speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        else:
+            # Andere Tasks (Aktionen, Lautstärke) trotzdem zum Zug kommen lassen
+            await asyncio.sleep(0)
+
+        self._index += 1
+        return data
+
+    def close(self):
+        pass
+
+
+class VolumeController:
+    """Fasst Lautstärketasten zu absoluten Mixer-Schreibzugriffen zusammen
+
+    Die aktuelle Lautstärke wird lokal mitgeführt. Ein Tastendruck wird sofort geschrieben,
+    weitere Tastendrücke innerhalb von VOLUME_COALESCE_WINDOW werden gesammelt und mit einem
+    einzigen set_volume() nachgezogen. Wird eine Taste gehalten (das Gerät meldet das Loslassen
+    mit einem leeren Report), wiederholt sich der Schritt mit zunehmender Geschwindigkeit.
+    """
+
+    def __init__(self, mixer, step=VOLUME_STEP, window=VOLUME_COALESCE_WINDOW):
+        self.mixer = mixer
+        self.step = step
+        self.window = window
+        self.level = None
+        self.presses = 0
+        self.writes = 0
+        self._pending = 0
+        self._last_press = 0.0
+        self._first_pending = None
+        self._release_seen = False
+        self._dirty = None
+        self._writer_task = None
+        self._repeat_task = None
+        self._writing = False
+
+    async def start(self):
+        self._dirty = asyncio.Event()
+        self.level = await asyncio.to_thread(self._read_level)
+        self._writer_task = asyncio.create_task(self._writer(), name="s330 volume writer")
+
+    async def stop(self):
+        for task in (self._repeat_task, self._writer_task):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(t for t in (self._repeat_task, self._writer_task) if t), return_exceptions=True)
+        logger.info(f"Volume: {self.presses} steps, {self.writes} mixer writes")
+
+    def _read_level(self):
+        try:
+            level = self.mixer.get_volume()
+            logger.debug("Current volume: %s%%", level)
+            return level
+        except Exception as e:
+            logger.warning(f"Could not read current volume: {e}")
+            return None
+
+    def press(self, direction):
+        """Tastendruck (direction +1/-1); startet bei gehaltener Taste die Wiederholung"""
+        self._add_step(direction)
+        if self._release_seen:
+            if self._repeat_task is not None:
+                self._repeat_task.cancel()
+            self._repeat_task = asyncio.create_task(self._repeat(direction), name="s330 volume repeat")
+
+    @property
+    def idle(self):
+        """Keine gehaltene Taste und nichts mehr zu schreiben"""
+        return (not self._dirty.is_set() and self._pending == 0 and not self._writing
+                and (self._repeat_task is None or self._repeat_task.done()))
+
+    def release(self):
+        self._release_seen = True
+        if self._repeat_task is not None:
+            self._repeat_task.cancel()
+            self._repeat_task = None
+
+    def _add_step(self, direction):
+        now = time.monotonic()
+        if now - self._last_press > VOLUME_RESYNC_AFTER and self._pending == 0:
+            # Lange keine Taste gedrückt: vor dem nächsten Schreiben neu lesen
+            self.level = None
+        self._last_press = now
+        if self._first_pending is None:
+            self._first_pending = now
+        self.presses += 1
+        self._pending += direction * self.step
+        self._dirty.set()
+
+    async def _repeat(self, direction):
+        await asyncio.sleep(VOLUME_HOLD_DELAY)
+        interval = VOLUME_REPEAT_INTERVAL
+        deadline = time.monotonic() + VOLUME_HOLD_MAX
+        limit = 100 if direction > 0 else 0
+        while time.monotonic() < deadline:
+            if self.level is not None and max(0, min(100, self.level + self._pending)) == limit:
+                break
+            self._add_step(direction)
+            await asyncio.sleep(interval)
+            interval = max(VOLUME_REPEAT_MIN_INTERVAL, interval * VOLUME_REPEAT_ACCELERATION)
+
+    async def _writer(self):
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            self._writing = True
+
+            try:
+                if self.level is None:
+                    self.level = await asyncio.to_thread(self._read_level)
+
+                pending, self._pending = self._pending, 0
+                first_press, self._first_pending = self._first_pending, None
+                start = time.monotonic()
+                if self.level is None:
+                    # Lautstärke unbekannt: relative Änderung wie bisher
+                    await asyncio.to_thread(self.mixer.change_volume, pending)
+                    self.writes += 1
+                else:
+                    target = max(0, min(100, self.level + pending))
+                    if target != self.level:
+                        await asyncio.to_thread(self.mixer.set_volume, target)
+                        self.writes += 1
+                        logger.debug("Volume set to %s%%", target)
+                    self.level = target
+                metrics.observe_since("mixer_write", start)
+                if first_press is not None:
+                    metrics.observe_since("volume_press_to_write", first_press)
+            except Exception as e:
+                logger.error(f"Error adjusting volume: {e}")
+                self.level = None
+            finally:
+                self._writing = False
+
+            # Weitere Tastendrücke in diesem Fenster werden zusammen geschrieben
+            await asyncio.sleep(self.window)
+
+
+class ButtonConfig:
+    """Tastenbelegung mit vorberechneter Zuordnung (report_id, payload) -> gedrückte Tasten
+
+    Bindungen gelten für eine Taste ("phone") oder eine Kombination ("volume_up+volume_down");
+    Kombinationen kennen nur die Geste "press".
+    """
+
+    def __init__(self, buttons=None, bindings=None, long_press=LONG_PRESS_TIME,
+                 double_press=DOUBLE_PRESS_WINDOW, chord_window=CHORD_WINDOW):
+        self.buttons = dict(DEFAULT_BUTTONS if buttons is None else buttons)
+        self.long_press = long_press
+        self.double_press = double_press
+        self.chord_window = chord_window
+        self.bindings = {}
+        self.chords = {}
+
+        for key, gestures in (DEFAULT_BINDINGS if bindings is None else bindings).items():
+            if isinstance(gestures, str):
+                gestures = {"press": gestures}
+            for gesture, action in gestures.items():
+                if gesture not in BUTTON_GESTURES:
+                    raise ValueError(f"Unknown gesture '{gesture}' for '{key}' (expected one of {', '.join(BUTTON_GESTURES)})")
+                if action not in BUTTON_ACTIONS:
+                    raise ValueError(f"Unknown action '{action}' for '{key}' (expected one of {', '.join(BUTTON_ACTIONS)})")
+            names = key.split("+")
+            for name in names:
+                if name not in self.buttons:
+                    raise ValueError(f"Unknown button '{name}' in binding '{key}'")
+            if len(names) > 1:
+                if set(gestures) != {"press"}:
+                    raise ValueError(f"Button combination '{key}' only supports 'press'")
+                self.chords[frozenset(names)] = gestures["press"]
+            else:
+                self.bindings[key] = dict(gestures)
+
+        # Tasten ohne Doppel-/Langdruck und ohne Kombination lösen sofort beim Drücken aus
+        in_chords = set().union(*self.chords)
+        self.immediate = {
+            name for name, gestures in self.bindings.items()
+            if set(gestures) == {"press"} and name not in in_chords
+        }
+
+        # Alle 256 Payloads je bekannter Report-ID vorab auflösen
+        self.table = {}
+        for report_id in {report_id for report_id, _ in self.buttons.values()}:
+            for payload in range(256):
+                self.table[(report_id, payload)] = frozenset(
+                    name for name, (rid, mask) in self.buttons.items()
+                    if rid == report_id and payload & mask == mask
+                )
+
+    @classmethod
+    def load(cls, path):
+        """Liest die Belegung aus einer JSON-Datei (fehlende Einträge = Standardwerte)"""
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+
+        buttons = None
+        if "buttons" in config:
+            buttons = {}
+            for name, (report_id, mask) in config["buttons"].items():
+                # Masken dürfen als Zahl oder als String ("0x08") angegeben werden
+                buttons[name] = (int(report_id), int(mask, 0) if isinstance(mask, str) else int(mask))
+
+        return cls(
+            buttons=buttons,
+            bindings=config.get("bindings"),
+            long_press=float(config.get("long_press", LONG_PRESS_TIME)),
+            double_press=float(config.get("double_press", DOUBLE_PRESS_WINDOW)),
+            chord_window=float(config.get("chord_window", CHORD_WINDOW)),
+        )
+
+    def report_id_of(self, name):
+        return self.buttons[name][0]
+
+
+class GestureEngine:
+    """Erkennt Druck, langen Druck, Doppeldruck und Tastenkombinationen
+
+    Entscheidend sind die Zeitstempel der Reports; Timer werden nur gebraucht, um einen
+    langen Druck noch während des Haltens und einen einfachen Druck nach Ablauf des
+    Doppeldruck-Fensters zu melden. Tasten, die nur "press" belegt haben, lösen ohne
+    Verzögerung beim Drücken aus.
+
+    Langer Druck und Doppeldruck brauchen leere Loslassen-Reports. Wie beim VolumeController
+    werden sie für eine Taste erst erkannt, nachdem das Gerät für sie ein Loslassen gemeldet
+    hat; bis dahin zählt jeder Druck als einfacher Druck.
+    """
+
+    def __init__(self, config, on_gesture, on_release):
+        self.config = config
+        self.on_gesture = on_gesture  # (Geste, Taste oder "a+b", Aktion)
+        self.on_release = on_release  # (Taste, Aktion) nach einem sofort ausgelösten Druck
+        self.counts = {}
+        self._held = {}  # Report-ID -> gedrückte Tasten
+        self._pressed_at = {}
+        self._consumed = set()  # Tasten, deren aktueller Druck schon eine Geste ausgelöst hat
+        self._taps = {}  # Taste -> Zeitpunkt des ersten Drucks eines möglichen Doppeldrucks
+        self._timers = {}
+        self._release_seen = set()  # Tasten, für die das Gerät schon ein Loslassen gemeldet hat
+
+    def handle_report(self, report_id, payload, timestamp):
+        """Verarbeitet einen Report; False, wenn er zu keiner bekannten Taste gehört"""
+        pressed = self.config.table.get((report_id, payload))
+        if pressed is None:
+            return False
+
+        previous = self._held.get(report_id, frozenset())
+        if pressed and pressed == previous:
+            # Wiederholter Report ohne Loslassen dazwischen: als neuer Druck werten
+            for name in previous:
+                self._release(name, timestamp)
+            previous = frozenset()
+
+        self._held[report_id] = pressed
+        for name in previous - pressed:
+            self._release_seen.add(name)
+            self._release(name, timestamp)
+
+        new = pressed - previous
+        for chord, action in self.config.chords.items():
+            if (chord & new and all(self._is_held(name) for name in chord)
+                    and not chord & self._consumed):
+                for name in chord:
+                    self._cancel_timer(name)
+                    self._taps.pop(name, None)
+                    self._consumed.add(name)
+                key = "+".join(sorted(chord))
+                self.counts[key] = self.counts.get(key, 0) + 1
+                self._fire("press", key, action)
+
+        for name in new:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self._pressed_at[name] = timestamp
+            if name not in self._consumed:
+                self._press(name)
+
+        # Payload ohne bekannte Taste (außer dem leeren Loslassen-Report)
+        return bool(pressed) or payload == 0
+
+    def _is_held(self, name):
+        return name in self._held.get(self.config.report_id_of(name), ())
+
+    def _press(self, name):
+        gestures = self.config.bindings.get(name, {})
+        if name in self.config.immediate:
+            self._fire("press", name, gestures["press"])
+            self._consumed.add(name)
+            return
+
+        self._cancel_timer(name)
+        if name not in self._release_seen and ("long_press" in gestures or "double_press" in gestures):
+            # Ohne gemeldetes Loslassen ließe sich weder die Haltedauer noch ein zweiter Druck messen:
+            # wie eine Taste behandeln, die nur zu einer Kombination gehört (einfacher Druck)
+            self._schedule(name, self.config.chord_window, self._chord_timeout)
+        elif "long_press" in gestures:
+            self._schedule(name, self.config.long_press, self._long_press_timeout)
+        elif "double_press" not in gestures:
+            # Nur Teil einer Kombination: kurz auf die zweite Taste warten
+            self._schedule(name, self.config.chord_window, self._chord_timeout)
+
+    def _release(self, name, timestamp):
+        self._cancel_timer(name)
+        gestures = self.config.bindings.get(name, {})
+        pressed_at = self._pressed_at.pop(name, timestamp)
+        if name in self._consumed:
+            self._consumed.discard(name)
+            if name in self.config.immediate:
+                self.on_release(name, gestures["press"])
+            return
+
+        if "long_press" in gestures and timestamp - pressed_at >= self.config.long_press:
+            self._taps.pop(name, None)
+            self._fire("long_press", name, gestures["long_press"])
+            return
+
+        if "double_press" in gestures:
+            first = self._taps.pop(name, None)
+            if first is not None and timestamp - first <= self.config.double_press:
+                self._fire("double_press", name, gestures["double_press"])
+                return
+            self._taps[name] = timestamp
+            self._schedule(name, self.config.double_press, self._double_press_timeout)
+            return
+
+        if "press" in gestures:
+            self._fire("press", name, gestures["press"])
+
+    def _long_press_timeout(self, name):
+        self._consumed.add(name)
+        self._taps.pop(name, None)
+        self._fire("long_press", name, self.config.bindings[name]["long_press"])
+
+    def _double_press_timeout(self, name):
+        self._taps.pop(name, None)
+        action = self.config.bindings[name].get("press")
+        if action:
+            self._fire("press", name, action)
+
+    def _chord_timeout(self, name):
+        self._consumed.add(name)
+        action = self.config.bindings.get(name, {}).get("press")
+        if action:
+            self._fire("press", name, action)
+
+    def _schedule(self, name, delay, callback):
+        self._timers[name] = asyncio.get_running_loop().call_later(delay, self._on_timer, name, callback)
+
+    def _on_timer(self, name, callback):
+        self._timers.pop(name, None)
+        callback(name)
+
+    def _cancel_timer(self, name):
+        timer = self._timers.pop(name, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _fire(self, gesture, key, action):
+        self.on_gesture(gesture, key, action)
+
+    def release_all(self, timestamp):
+        """Lässt alle gehaltenen Tasten los (Gerät abgezogen)
+
+        Zählt nicht als vom Gerät gemeldetes Loslassen (siehe _release_seen).
+        """
+        for report_id, held in list(self._held.items()):
+            self._held[report_id] = frozenset()
+            for name in held:
+                self._release(name, timestamp)
+
+    @property
+    def pending(self):
+        """Ob noch eine Geste auf ihren Timer wartet"""
+        return bool(self._timers)
+
+    def close(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+
+
+class ButtonService:
+    """Asynchroner Kern des Button-Monitors
+
+    Ein Reader-Task liest die HID-Reports, jede Aktion läuft als eigener Task. Blockierende
+    Aufrufe (Web-API, Mixer) laufen in Worker-Threads, damit der nächste Report sofort
+    verarbeitet wird; z.B. bleiben die Lautstärketasten nutzbar, während ein Wake-Trigger läuft.
+    """
+
+    def __init__(self, reader, mixer, debug=False, max_concurrent_actions=MAX_CONCURRENT_ACTIONS,
+                 button_config=None):
+        self.reader = reader
+        self.mixer = mixer
+        self.debug = debug
+        self.volume = VolumeController(mixer) if mixer else None
+        self.gestures = GestureEngine(button_config or ButtonConfig(), self._on_gesture, self._on_release)
+        self.actions = {
+            "volume_up": lambda: self._change_volume(1),
+            "volume_down": lambda: self._change_volume(-1),
+            "toggle_satellite": lambda: self.dispatch("satellite", toggle_satellite_state, policy="drop"),
+            "wake": lambda: self.dispatch("satellite", force_activate_satellite, policy="drop"),
+            # Cancel wartet auf eine laufende Satellite-Aktion, damit deren trigger-wake ihn nicht überholt
+            "cancel": lambda: self.dispatch("satellite", cancel_satellite),
+        }
+        self._actions = {}
+        self._report_time = time.monotonic()
+        self.recorder = None
+        self.on_ready = None
+        self.reports = 0
+        self._finish_task = None
+        self.failed = False  # Gerät nicht mehr nutzbar, Exit-Code 1
+        self._semaphore = asyncio.Semaphore(max_concurrent_actions)
+        self._stopped = asyncio.Event()
+
+    async def run(self, handle_signals=True):
+        """Liest Reports, bis stop() aufgerufen wird (auch per SIGINT/SIGTERM, außer handle_signals=False)"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM) if handle_signals else ():
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        if self.volume:
+            await self.volume.start()
+
+        reader_task = asyncio.create_task(self._read_reports(), name="s330 hid reader")
+        if self.on_ready is not None:
+            self.on_ready()
+        try:
+            await self._stopped.wait()
+        finally:
+            logger.info("Exiting...")
+            reader_task.cancel()
+            for task in list(self._actions.values()):
+                task.cancel()
+            await asyncio.gather(reader_task, *self._actions.values(), return_exceptions=True)
+            self.gestures.close()
+            if self.volume:
+                await self.volume.stop()
+
+    def stop(self):
+        self._stopped.set()
+
+    def device_lost(self):
+        """Gerät abgezogen: gehaltene Tasten loslassen, damit z.B. die Lautstärke nicht weiterläuft"""
+        self.gestures.release_all(time.monotonic())
+
+    def stop_when_idle(self):
+        """Beendet den Dienst, sobald alle ausgelösten Aktionen fertig sind (Ende eines Replays)"""
+        self._finish_task = asyncio.create_task(self._stop_when_idle())
+
+    async def _stop_when_idle(self):
+        while self.gestures.pending or self._actions or (self.volume and not self.volume.idle):
+            await asyncio.sleep(0.01)
+        self.stop()
+
+    async def _read_reports(self):
+        logger.info("Monitoring for button presses...")
+        while True:
+            try:
+                # Lese Daten vom Gerät (wartet, bis ein Report ankommt)
+                data = await self.reader.read_async()
+                received = time.monotonic()
+
+                # Wenn Daten empfangen wurden, verarbeite sie
+                if data and len(data) > 1:
+                    self.reports += 1
+                    if self.recorder is not None:
+                        self.recorder.write(received, data)
+                    self.handle_report(data, received)
+                    metrics.observe_since("report_handling", received)
+            except asyncio.CancelledError:
+                raise
+            except DeviceAccessError as e:
+                # Warten hilft hier nicht: beenden, damit der Fehler im Exit-Code/systemd sichtbar wird
+                logger.error(str(e))
+                self.failed = True
+                self.stop()
+                return
+            except Exception as e:
+                logger.error(f"Error in reading loop: {e}")
+                await asyncio.sleep(1)
+
+    def handle_report(self, data, timestamp=None):
+        """Übergibt einen HID-Report an die Gestenerkennung"""
+        # Debug-Ausgabe für Datenpakete, falls gewünscht
+        if self.debug:
+            logger.debug("Received data: %s", data)
+
+        report_id = data[0]
+        payload = data[1]
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self._report_time = timestamp
+
+        if not self.gestures.handle_report(report_id, payload, timestamp):
+            # Log unbekannte Tasten
+            logger.info("❓ BUTTON: Unknown button (report_id: %s, payload: %02x)", report_id, payload)
+
+    def _on_gesture(self, gesture, key, action):
+        # Aktion zuerst starten, die Meldung wird erst im Log-Thread formatiert
+        self.actions[action]()
+        logger.info("%s BUTTON: %s %s (count: %s) → %s", ACTION_ICONS.get(action, ''), key.replace("_", " ").upper(),
+                    gesture.replace("_", " "), self.gestures.counts.get(key, 0), action)
+
+    def _on_release(self, name, action):
+        # Gehaltene Lautstärketaste losgelassen: Wiederholung beenden
+        if action in ("volume_up", "volume_down") and self.volume:
+            self.volume.release()
+
+    def _change_volume(self, direction):
+        if self.volume:
+            self.volume.press(direction)
+        else:
+            logger.warning(f"Volume {'UP' if direction > 0 else 'DOWN'} pressed but no audio control available")
+
+    def dispatch(self, key, func, *args, policy="serial"):
+        """Führt eine blockierende Aktion als eigenen Task in einem Worker-Thread aus
+
+        Aktionen mit demselben Schlüssel laufen nie gleichzeitig; eine Aktion gilt als laufend,
+        bis ihr Thread wirklich fertig ist. `policy` legt fest, was mit einem neuen Aufruf
+        passiert, solange der vorherige noch läuft: "serial" wartet auf ihn, "drop" verwirft ihn.
+        """
+        previous = self._actions.get(key)
+        if previous is not None and not previous.done():
+            if policy == "drop":
+                logger.info(f"Action '{key}' still in progress, ignoring press")
+                return None
+        else:
+            previous = None
+
+        task = asyncio.create_task(self._run_action(key, previous, self._report_time, func, *args),
+                                   name=f"s330 action {key}")
+        self._actions[key] = task
+        task.add_done_callback(lambda t: self._actions.pop(key) if self._actions.get(key) is t else None)
+        return task
+
+    async def _run_action(self, key, previous, report_time, func, *args):
+        if previous is not None:
+            # Auf die vorherige Aktion warten, ohne deren Fehler/Abbruch zu übernehmen
+            await asyncio.wait({previous})
+
+        # Der Worker-Thread lässt sich nicht abbrechen: Schlüssel und Semaphore bleiben belegt, bis er
+        # zurückkehrt, auch über ACTION_TIMEOUT hinaus. So überholt z.B. ein Cancel keinen noch laufenden
+        # Wake-Trigger, und hängende Aufrufe stapeln sich nicht im Executor.
+        async with self._semaphore:
+            try:
+                start = time.monotonic()
+                worker = asyncio.ensure_future(asyncio.to_thread(func, *args))
+                try:
+                    await asyncio.wait_for(asyncio.shield(worker), ACTION_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Action '{key}' still running after {ACTION_TIMEOUT:.0f}s, "
+                                   "further presses wait for it")
+                    await worker
+                # Dauer der Aktion und Gesamtzeit ab Eintreffen des HID-Reports
+                metrics.observe_since(f"action_{key}", start)
+                metrics.observe_since(f"report_to_done_{key}", report_time)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in action '{key}': {e}")
+
+
+def setup_logging(log_level=logging.INFO, log_file=None, buffer_size=service_logging.DEFAULT_BUFFER_SIZE,
+                  dump_file=None, capture_debug=False):
+    """Konfiguriert das Logging-System
+
+    Konsole und Log-Datei werden von einem Hintergrund-Thread geschrieben (die Datei gesammelt
+    alle paar Sekunden), die letzten Meldungen liegen für kill -USR2 im Speicher (DEBUG nur
+    mit capture_debug, siehe --log-buffer-debug).
+    """
+    global log_pipeline
+    log_pipeline = service_logging.setup_logging(log_level, log_format, log_file, buffer_size, dump_file,
+                                                 capture_debug)
+    return logging.getLogger()
+
+def open_hid_device(debug=False):
+    """Öffnet die Anker S330 über das hidapi- bzw. hid-Modul
+
+    Gibt (device, using_hid) zurück oder (None, None), wenn das Gerät nicht geöffnet werden konnte.
+    """
+    # Versuche zuerst, das hidapi-Modul zu importieren
+    try:
+        import hidapi
+        logger.info("Using hidapi module")
+        using_hid = False
+    except ImportError:
+        # Wenn hidapi nicht verfügbar ist, verwende hid
         try:
             import hid
             logger.info("Using hid module")
@@ -247,7 +2327,7 @@ def main():
         except ImportError:
             logger.error("Neither 'hidapi' nor 'hid' module found. Please install one of them.")
             logger.error("  sudo pip3 install hidapi --break-system-packages")
-            return
+            return None, None
 
     # Anker S330 finden und öffnen
     device = None
@@ -275,7 +2355,7 @@ def main():
                         p_id = info.get('product_id')
                     
                     # Wenn wir im Debug-Modus sind, zeige alle gefundenen Geräte an
-                    if args.debug:
+                    if debug:
                         logger.debug(f"Found HID device: {v_id=:04x}, {p_id=:04x}")
                     
                     if v_id == VID and p_id == PID:
@@ -289,7 +2369,7 @@ def main():
                     
             if not found:
                 logger.error(f"Anker S330 device not found (VID: {hex(VID)}, PID: {hex(PID)})")
-                return
+                return None, None
                 
             # Versuche, das Gerät zu öffnen
             try:
@@ -307,130 +2387,271 @@ def main():
                     raise Exception("No path available for device")
     except Exception as e:
         logger.error(f"Error setting up HID device: {e}")
-        return
+        return None, None
+
+    return device, using_hid
+
+def build_parser():
+    """Kommandozeilenargumente des Button-Service (auch für --buttons von voice_mini.py)"""
+    parser = argparse.ArgumentParser(description='Anker PowerConf S330 Button Monitor')
+    parser.add_argument('--debug', action='store_true', help='Enable debug logging')
+    parser.add_argument('--log-file', help='Path to log file')
+    parser.add_argument('--audio-control', help='Audio mixer control to use (e.g., Master, PCM, Speaker)')
+    parser.add_argument('--mixer-backend', choices=['auto', 'alsa', 'amixer', 'null'], default='auto',
+                        help='Volume backend: alsa (in-process via libasound), amixer (subprocess per press), '
+                             'null (no audio device, for replays) or auto (default: alsa, falling back to amixer)')
+    parser.add_argument('--wake-word', help='Wake word to use when triggering (overrides auto-detection)')
+    parser.add_argument('--wyoming-api-host',
+                        help='Wyoming API host (default: from the running satellite\'s --api-uri, else 127.0.0.1)')
+    parser.add_argument('--wyoming-api-port', type=int,
+                        help='Wyoming API port (default: from the running satellite\'s --api-uri, else 8080)')
+    parser.add_argument('--no-satellite-discovery', action='store_true',
+                        help='Do not read API URI and wake word from the running wyoming-satellite process')
+    parser.add_argument('--wyoming-control-uri',
+                        help='Send trigger/cancel as Wyoming events over a persistent connection to this '
+                             'tcp:// or unix:// URI (falls back to the Web API on errors). These are not standard '
+                             'Wyoming events; use with --state-uri so that ignored events fall back to the Web API')
+    parser.add_argument('--state-uri',
+                        help='Satellite state stream of the LED service (its --state-uri, e.g. tcp://127.0.0.1:10501); '
+                             'lets the phone button decide between cancel and wake without GET /status')
+    parser.add_argument('--max-concurrent-actions', type=int, default=MAX_CONCURRENT_ACTIONS,
+                        help=f'Maximum number of button actions running at the same time (default: {MAX_CONCURRENT_ACTIONS})')
+    parser.add_argument('--button-config',
+                        help='JSON file with button bindings (long press, double press, button combinations); '
+                             'see Readme')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Serve latency histograms in Prometheus text format on http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--metrics-interval', type=float,
+                        help='Log a latency summary (p50/p95/p99 per stage) every N seconds')
+    parser.add_argument('--record', metavar='FILE',
+                        help='Write every HID report with a timestamp to FILE (JSON lines) for --replay')
+    parser.add_argument('--replay', metavar='FILE',
+                        help='Read HID reports from a --record file instead of the S330 and exit at its end')
+    parser.add_argument('--replay-speed', type=float, default=1.0,
+                        help='Replay speed factor (default: 1.0; 0 = no pauses; anything but 1 changes gesture timing)')
+    parser.add_argument('--cache-file', default=DEFAULT_CACHE_FILE,
+                        help=f'Startup cache of discovered device node and mixer control (default: {DEFAULT_CACHE_FILE})')
+    parser.add_argument('--no-cache', action='store_true', help='Always discover device and mixer control at startup')
+    parser.add_argument('--reader', choices=['auto', 'hidraw', 'thread', 'poll'], default='auto',
+                        help='HID read mode: hidraw (select on /dev/hidraw*), thread (blocking reader thread), '
+                             'poll (legacy 100 ms polling) or auto (default: hidraw, falling back to thread)')
+    service_logging.add_arguments(parser)
+    return parser
+
+
+def main():
+    # Kommandozeilenargumente parsen
+    args = build_parser().parse_args()
+    
+    # Logging einrichten
+    log_level = logging.DEBUG if args.debug else logging.INFO
+    setup_logging(log_level, args.log_file, args.log_buffer, args.log_dump_file, args.log_buffer_debug)
+    
+    logger.info("Starting button monitoring for Anker PowerConf S330...")
+
+    exit_code = 0
+    try:
+        exit_code = asyncio.run(run_service(args))
+    except KeyboardInterrupt:
+        logger.info("\nExiting...")
+    except Exception as e:
+        logger.error(f"Error in main loop: {e}")
+        exit_code = 1
+    finally:
+        if log_pipeline:
+            log_pipeline.stop()
+    sys.exit(exit_code)
+
+
+async def run_service(args, state_mirror=None, handle_signals=True):
+    """Richtet Gerät, Mixer und API ein und führt den ButtonService bis zum Beenden aus
+
+    state_mirror: bereits versorgter SatelliteStateMirror (gemeinsamer Prozess mit dem LED-Service),
+    ersetzt --state-uri. handle_signals=False, wenn der Aufrufer SIGINT/SIGTERM selbst behandelt.
+    Liefert den Exit-Code: 0 nach regulärem Beenden, 1 wenn Gerät oder Konfiguration nicht nutzbar sind.
+    """
+    reader = None
+    hidraw_paths = []
+    if log_pipeline:
+        log_pipeline.install_dump_signal(asyncio.get_running_loop())
+    timer = StartupTimer(_MODULE_START)
+    timer.mark("imports")
+    cache = StartupCache(None if args.no_cache else args.cache_file)
+
+    # Tastenbelegung zuerst prüfen, damit ein Tippfehler nicht erst beim Tastendruck auffällt
+    button_config = None
+    if args.button_config:
+        try:
+            button_config = ButtonConfig.load(args.button_config)
+            logger.info(f"Using button bindings from {args.button_config}")
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Invalid button config {args.button_config}: {e}")
+            return 1
+
+    # Aufzeichnung abspielen statt vom Gerät zu lesen
+    if args.replay:
+        try:
+            reader = ReplayReader(args.replay, args.replay_speed)
+            logger.info(f"Replaying {len(reader.reports)} reports from {args.replay}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not read trace {args.replay}: {e}")
+            return 1
+
+    # Bevorzugt: direkt auf dem hidraw-Knoten blockieren (kein Polling)
+    if reader is None and args.reader in ("auto", "hidraw"):
+        start = time.monotonic()
+        hidraw_paths = cache.get("hidraw_paths", hidraw_paths_valid)
+        cached = bool(hidraw_paths)
+        if not cached:
+            hidraw_paths = find_hidraw_devices()
+        if hidraw_paths:
+            cache.measured("hidraw_paths", time.monotonic() - start, hit=cached)
+        if hidraw_paths:
+            try:
+                reader = HotplugHidrawReader(hidraw_paths)
+                cache.set("hidraw_paths", hidraw_paths)
+                logger.info(f"Using hidraw reader on {', '.join(hidraw_paths)}{' (cached)' if cached else ''}")
+            except OSError as e:
+                # Mit auto folgt noch der hidapi-Versuch, sonst ist das Gerät nicht nutzbar
+                log = logger.warning if args.reader == "auto" else logger.error
+                log(describe_open_error(hidraw_paths, e))
+                cache.discard("hidraw_paths")
+        if reader is None and args.reader == "hidraw":
+            if hidraw_paths:
+                # Angesteckt, aber nicht zu öffnen: Warten auf ein add-Event würde ewig dauern
+                return 1
+            reader = HotplugHidrawReader()
+            logger.warning(f"Anker S330 (VID: {hex(VID)}, PID: {hex(PID)}) not found, waiting for it to be plugged in")
+
+    # Fallback: hidapi/hid-Modul mit Reader-Thread oder klassischem Polling
+    if reader is None:
+        device, using_hid = open_hid_device(args.debug)
+        if device is None:
+            if args.reader != "auto" or not os.path.isdir(HIDRAW_SYSFS_DIR) or hidraw_paths:
+                return 1
+            # Nicht eingesteckt: per hidraw auf das Gerät warten statt zu beenden (und neu gestartet zu werden)
+            reader = HotplugHidrawReader()
+            logger.warning("Anker S330 not found, waiting for it to be plugged in")
+        elif args.reader == "poll":
+            reader = PollingReader(device, using_hid)
+            logger.info("Using polling reader")
+        else:
+            reader = ThreadedReader(device, using_hid)
+            logger.info("Using threaded reader")
+
+    timer.mark("device", type(reader).__name__)
 
     # Bestimme den zu verwendenden Audio-Mixer-Control
-    audio_control = args.audio_control if args.audio_control else get_available_audio_controls()
+    mixer = create_mixer(args.mixer_backend, args.audio_control, cache)
+    timer.mark("mixer", mixer.name if mixer else "none")
+    cache.save()
     
     # Wyoming-API-Konfiguration
     api_host = args.wyoming_api_host
     api_port = args.wyoming_api_port
     wake_word = args.wake_word
-    
+
     # Aktualisiere die globale API-Basis-URL mit den übergebenen Parametern
-    global WYOMING_API_BASE_URL
-    WYOMING_API_BASE_URL = f"http://{api_host}:{api_port}/api"
-    
+    global WYOMING_API_BASE_URL, WAKE_WORD, _control_client, _state_mirror, metrics
+    WYOMING_API_BASE_URL = f"http://{api_host or WYOMING_API_HOST}:{api_port or WYOMING_API_PORT}/api"
+    WAKE_WORD = wake_word
+
     if wake_word:
         logger.info(f"Using manually specified wake word: {wake_word}")
-    
-    logger.info(f"Wyoming API configuration: {api_host}:{api_port} (URL: {WYOMING_API_BASE_URL})")
-    
-    # Hauptschleife zum Lesen der Tasten
-    try:
-        logger.info("Monitoring for button presses...")
-        button_count = {}
-        while True:
-            try:
-                # Lese Daten vom Gerät
-                if using_hid:
-                    # Mit hid-Paket
-                    data = device.read(64)
-                else:
-                    # Mit hidapi-Paket
-                    try:
-                        data = device.read(64, timeout_ms=100)
-                    except Exception as e:
-                        logger.debug(f"Error reading data: {e}")
-                        time.sleep(0.1)
-                        continue
 
-                # Wenn Daten empfangen wurden, verarbeite sie
-                if data and len(data) > 1:
-                    # Debug-Ausgabe für Datenpakete, falls gewünscht
-                    if args.debug:
-                        logger.debug(f"Received data: {data}")
-                    
-                    report_id = data[0]
-                    payload = data[1]
-                    
-                    # Erstelle einen eindeutigen Schlüssel für diesen Button
-                    button_key = f"{report_id}:{payload}"
-                    # Initialisiere oder erhöhe den Zähler für diesen Button
-                    button_count[button_key] = button_count.get(button_key, 0) + 1
-                    count = button_count[button_key]
-
-                    if report_id == 1:
-                        if payload == 0x08:
-                            logger.info(f"🔊 BUTTON: VOLUME UP pressed (count: {count})")
-                            if audio_control:
-                                try:
-                                    # Verwende den erkannten Audio-Control
-                                    cmd = f"amixer sset '{audio_control}' 5%+"
-                                    logger.debug(f"Running command: {cmd}")
-                                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                                    if result.returncode != 0:
-                                        logger.warning(f"Volume up command failed: {result.stderr.strip()}")
-                                    else:
-                                        logger.debug(f"Volume up command succeeded: {result.stdout.strip()}")
-                                except Exception as e:
-                                    logger.error(f"Error adjusting volume up: {e}")
-                            else:
-                                logger.warning("Volume UP pressed but no audio control available")
-                                # Alternativ könnten wir hier XF86AudioRaiseVolume-Taste simulieren
-                                # oder einen anderen Weg nutzen, die Lautstärke anzupassen
-                        elif payload == 0x10:
-                            logger.info(f"🔉 BUTTON: VOLUME DOWN pressed (count: {count})")
-                            if audio_control:
-                                try:
-                                    # Verwende den erkannten Audio-Control
-                                    cmd = f"amixer sset '{audio_control}' 5%-"
-                                    logger.debug(f"Running command: {cmd}")
-                                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-                                    if result.returncode != 0:
-                                        logger.warning(f"Volume down command failed: {result.stderr.strip()}")
-                                    else:
-                                        logger.debug(f"Volume down command succeeded: {result.stdout.strip()}")
-                                except Exception as e:
-                                    logger.error(f"Error adjusting volume down: {e}")
-                            else:
-                                logger.warning("Volume DOWN pressed but no audio control available")
-                                # Alternativ könnten wir hier XF86AudioLowerVolume-Taste simulieren
-                    elif report_id == 2:
-                        if payload == 0x03:
-                            logger.info(f"📞 BUTTON: PHONE button pressed (count: {count}) → toggling satellite state")
-                            # Verwende die Web-API, um den Satellite zu steuern
-                            toggle_satellite_state()
-                        else:
-                            # Log unbekannte Tasten im Report 2
-                            logger.info(f"❓ BUTTON: Unknown button (report_id: {report_id}, payload: {payload:02x}, count: {count})")
-                    else:
-                        # Log alle anderen unbekannten Tasten
-                        logger.info(f"❓ BUTTON: Unknown button (report_id: {report_id}, payload: {payload:02x}, count: {count})")
-                    
-                # Kurze Pause
-                time.sleep(0.05)
-                
-            except KeyboardInterrupt:
-                break
-            except Exception as e:
-                logger.error(f"Error in reading loop: {e}")
-                time.sleep(1)
-    except KeyboardInterrupt:
-        logger.info("\nExiting...")
-    except Exception as e:
-        logger.error(f"Error in main loop: {e}")
+    # Optionaler schneller Pfad über eine dauerhafte Wyoming-Verbindung
+    if args.wyoming_control_uri:
+        _control_client = WyomingControlClient(args.wyoming_control_uri, wake_word)
+
+    def apply_satellite(info):
+        """Übernimmt API-URL und Wake-Word des (neu gestarteten) Satellites, soweit nicht vorgegeben"""
+        global WYOMING_API_BASE_URL, WAKE_WORD
+        if info is None:
+            return
+        if api_host is None and api_port is None and info.api_base_url:
+            WYOMING_API_BASE_URL = info.api_base_url
+        if wake_word is None and info.wake_word != WAKE_WORD:
+            WAKE_WORD = info.wake_word
+            if _control_client:
+                _control_client.set_wake_word(WAKE_WORD)
+        logger.info(f"Wyoming API URL: {WYOMING_API_BASE_URL}, wake word: {WAKE_WORD or 'satellite default'}")
+
+    # API-URL und Wake-Word aus der Kommandozeile des laufenden Satellites; nach einem Neustart
+    # des Satellites (neue PID) werden sie neu gelesen
+    discovery = None
+    if not args.no_satellite_discovery and (wake_word is None or (api_host is None and api_port is None)):
+        discovery = SatelliteDiscovery(on_change=apply_satellite)
+        discovery.refresh()
+        timer.mark("satellite", f"PID {discovery.info.pid}" if discovery.info else "not running")
+
+    logger.info(f"Wyoming API configuration: {WYOMING_API_BASE_URL}")
+
+    # Satellite-Zustand aus dem Event-Stream des LED-Service spiegeln
+    if state_mirror is not None:
+        _state_mirror = state_mirror
+    elif args.state_uri:
+        _state_mirror = SatelliteStateMirror(args.state_uri)
+
+    if _control_client and _state_mirror is None:
+        logger.warning("--wyoming-control-uri without --state-uri: trigger-wake/cancel are not standard Wyoming "
+                       "events and their delivery cannot be confirmed; presses are lost if the satellite ignores them")
+
+    metrics_handles = []
+    if args.metrics_port or args.metrics_interval:
+        metrics = Metrics("s330_buttons")
+        metrics_handles = await start_reporting(metrics, args.metrics_port, args.metrics_interval, logger)
+
+    service = ButtonService(reader, mixer, debug=args.debug, max_concurrent_actions=args.max_concurrent_actions,
+                            button_config=button_config)
+    if args.replay:
+        reader.on_finished = service.stop_when_idle
+    if isinstance(reader, HotplugHidrawReader):
+        def device_connected(paths):
+            cache.set("hidraw_paths", paths)
+            cache.save()
+
+        reader.on_connect = device_connected
+        reader.on_disconnect = service.device_lost
+    if args.record:
+        service.recorder = TraceRecorder(args.record)
+        logger.info(f"Recording HID reports to {args.record}")
+
+    def ready():
+        timer.mark("service")
+        timer.report(cache)
+        # Client (requests-Import und Keep-Alive-Session) im Hintergrund anlegen, wenn die Tasten
+        # schon bedient werden; ein früher Tastendruck wartet höchstens auf diesen Import
+        asyncio.get_running_loop().run_in_executor(None, get_api_client)
+
+    service.on_ready = ready
+    watch_task = asyncio.create_task(discovery.watch()) if discovery else None
+    try:
+        await service.run(handle_signals)
     finally:
+        if watch_task:
+            watch_task.cancel()
+        if service.recorder:
+            service.recorder.close()
         # Schließe das Gerät
-        if device:
-            try:
-                if using_hid:
-                    device.close()
-                else:
-                    device.close()
-                logger.info("Device closed")
-            except Exception as e:
-                logger.error(f"Error closing device: {e}")
+        try:
+            reader.close()
+            logger.info("Device closed")
+        except Exception as e:
+            logger.error(f"Error closing device: {e}")
+        if mixer:
+            mixer.close()
+        if _state_mirror:
+            _state_mirror.close()
+        if _control_client:
+            _control_client.log_stats()
+            _control_client.close()
+        if _api_client:
+            _api_client.log_stats()
+            _api_client.close()
+        if metrics.enabled:
+            await stop_reporting(metrics_handles)
+            logger.info(f"Metrics: {metrics.summary()}")
+    return 1 if service.failed else 0
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,253 @@
+"""Queue-based logging shared by the button and LED services.
+
+Logging calls only put the LogRecord on a queue; formatting and all writes
+happen in one background thread, so a slow SD card never blocks the HID
+loop or the event server. The writer thread
+
+- passes records at the configured level to the console and the log file,
+- keeps the most recent records in a ring buffer that is written out on
+  demand (kill -USR2, see install_dump_signal). DEBUG records that are not
+  printed are only kept with capture_debug (--log-buffer-debug): the loggers
+  then create and queue a record for every debug call, which costs time on
+  the hot paths, including those of libraries such as urllib3 and wyoming,
+- collects file output and writes it at most every flush_interval seconds
+  (immediately for WARNING and above, or when a batch is full).
+
+Messages are formatted in the writer thread, so hot paths should use lazy
+%-style arguments (logger.debug("... %s", value)) rather than f-strings.
+"""
+import argparse
+import asyncio
+import atexit
+import logging
+import logging.handlers
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional, TextIO
+
+DEFAULT_BUFFER_SIZE = 1000
+FLUSH_INTERVAL = 2.0
+FLUSH_MAX_RECORDS = 256
+QUEUE_SIZE = 10000
+
+# Queue item asking the writer thread to write the ring buffer
+_DUMP = object()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller and leaves formatting to the writer thread."""
+
+    def __init__(self, log_queue: "queue.Queue") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The record is handled in the same process, so msg/args need not be merged here
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchingFileHandler(logging.Handler):
+    """Appends formatted records to a file in batches (used from the writer thread only)."""
+
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL,
+                 max_records: int = FLUSH_MAX_RECORDS) -> None:
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_records = max_records
+        self.batch: List[str] = []
+        self.last_flush = time.monotonic()
+        self._file: TextIO = open(path, "a", encoding="utf-8")
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.batch.append(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+            return
+        if record.levelno >= logging.WARNING or len(self.batch) >= self.max_records:
+            self.flush()
+
+    def due(self, now: float) -> Optional[float]:
+        """Seconds until the pending batch has to be written, None if nothing is pending."""
+        if not self.batch:
+            return None
+        return max(0.0, self.last_flush + self.flush_interval - now)
+
+    def flush(self) -> None:
+        if self.batch:
+            try:
+                self._file.write("".join(self.batch))
+                self._file.flush()
+            except OSError:
+                pass
+            self.batch.clear()
+        self.last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+        super().close()
+
+
+class LogPipeline:
+    """Logging queue, writer thread, outputs and ring buffer of one service."""
+
+    def __init__(self, level: int, formatter: logging.Formatter, log_file: Optional[str] = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE, dump_file: Optional[str] = None,
+                 stream: TextIO = sys.stderr, capture_debug: bool = False) -> None:
+        self.level = level
+        self.capture_debug = capture_debug
+        self.formatter = formatter
+        self.dump_file = dump_file
+        self.queue: "queue.Queue" = queue.Queue(QUEUE_SIZE)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.recent: Deque[logging.LogRecord] = deque(maxlen=max(0, buffer_size))
+
+        console = logging.StreamHandler(stream)
+        console.setFormatter(formatter)
+        self.outputs: List[logging.Handler] = [console]
+        self.file_handler: Optional[BatchingFileHandler] = None
+        if log_file:
+            self.file_handler = BatchingFileHandler(log_file)
+            self.file_handler.setFormatter(formatter)
+            self.outputs.append(self.file_handler)
+
+        self._reported_drops = 0
+        self._thread = threading.Thread(target=self._run, name="log writer", daemon=True)
+
+    @property
+    def capture_level(self) -> int:
+        """Level the loggers have to pass on: DEBUG only if the ring buffer should keep it."""
+        return logging.DEBUG if (self.capture_debug and self.recent.maxlen) else self.level
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write everything that is still queued and close the outputs (idempotent)."""
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout=5)
+
+    def dump(self) -> None:
+        """Ask the writer thread to write the ring buffer to dump_file (or the console)."""
+        try:
+            self.queue.put_nowait(_DUMP)
+        except queue.Full:
+            pass
+
+    def _timeout(self) -> float:
+        # Wake up for the next file write, otherwise now and then to report dropped records
+        due = self.file_handler.due(time.monotonic()) if self.file_handler else None
+        return FLUSH_INTERVAL if due is None else due
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self.queue.get(timeout=self._timeout())
+            except queue.Empty:
+                self._flush()
+                continue
+            if item is None:
+                break
+            if item is _DUMP:
+                self._write_dump()
+                continue
+            self._handle(item)
+        self._flush()
+        for output in self.outputs:
+            output.close()
+
+    def _handle(self, record: logging.LogRecord) -> None:
+        self.recent.append(record)
+        if record.levelno >= self.level:
+            for output in self.outputs:
+                output.handle(record)
+
+    def _log(self, level: int, msg: str, *args: object) -> None:
+        """Log a message of the pipeline itself (from the writer thread)."""
+        self._handle(logging.LogRecord(__name__, level, __file__, 0, msg, args, None))
+
+    def _flush(self) -> None:
+        dropped = self.handler.dropped
+        if dropped != self._reported_drops:
+            self._log(logging.WARNING, "%d log records dropped (queue full)", dropped - self._reported_drops)
+            self._reported_drops = dropped
+        if self.file_handler:
+            self.file_handler.flush()
+
+    def _format(self, record: logging.LogRecord) -> str:
+        try:
+            return self.formatter.format(record)
+        except Exception:
+            return f"<unformattable log record {record.msg!r}>"
+
+    def _write_dump(self) -> None:
+        count = len(self.recent)
+        text = "".join(self._format(record) + "\n" for record in self.recent)
+        try:
+            if self.dump_file:
+                with open(self.dump_file, "w", encoding="utf-8") as f:
+                    f.write(text)
+                self._log(logging.INFO, "Wrote %d recent log records to %s", count, self.dump_file)
+            else:
+                console = self.outputs[0]
+                console.stream.write(f"---- last {count} log records ----\n{text}---- end of log records ----\n")
+                console.flush()
+        except OSError as e:
+            self._log(logging.WARNING, "Could not write log dump to %s: %s", self.dump_file, e)
+
+    def install_dump_signal(self, loop: asyncio.AbstractEventLoop, signum: int = signal.SIGUSR2) -> None:
+        """Dump the ring buffer on kill -USR2 <pid> (handled by the event loop, not in the signal handler)."""
+        try:
+            loop.add_signal_handler(signum, self.dump)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Logging options shared by both services (--log-file and --debug are defined by each service)."""
+    parser.add_argument(
+        "--log-buffer",
+        type=int,
+        default=DEFAULT_BUFFER_SIZE,
+        help=f"Keep the last N log records in memory for kill -USR2 (default: {DEFAULT_BUFFER_SIZE}, 0 = off)",
+    )
+    parser.add_argument(
+        "--log-buffer-debug",
+        action="store_true",
+        help="Also keep DEBUG records that are not printed in the --log-buffer (costs time on every debug call)",
+    )
+    parser.add_argument(
+        "--log-dump-file",
+        help="Where kill -USR2 writes the recent log records (default: the console)",
+    )
+
+
+def setup_logging(level: int, formatter: logging.Formatter, log_file: Optional[str] = None,
+                  buffer_size: int = DEFAULT_BUFFER_SIZE, dump_file: Optional[str] = None,
+                  capture_debug: bool = False) -> LogPipeline:
+    """Route all logging through a LogPipeline and start its writer thread.
+
+    The caller installs the dump signal once its event loop runs (install_dump_signal).
+    """
+    pipeline = LogPipeline(level, formatter, log_file, buffer_size, dump_file, capture_debug=capture_debug)
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(pipeline.handler)
+    root_logger.setLevel(pipeline.capture_level)
+    pipeline.start()
+    atexit.register(pipeline.stop)
+    return pipeline
@@ -0,0 +1,229 @@
+"""Latency histograms and counters shared by the button and LED services.
+
+Both services create a Metrics registry only when --metrics-port or
+--metrics-interval is given; otherwise they use NULL_METRICS, whose methods
+do nothing, so instrumented code paths cost one method call.
+
+Latencies are kept twice: in cumulative buckets (exported in the Prometheus
+text format) and as the most recent samples, from which p50/p95/p99 are taken.
+"""
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+# Upper bounds (seconds) of the histogram buckets, +Inf is implicit
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+RECENT_SAMPLES = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Latency distribution of one stage."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, recent: int = RECENT_SAMPLES) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=recent)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+            self.recent.append(seconds)
+
+    def quantiles(self, quantiles=QUANTILES) -> List[float]:
+        """Nearest-rank quantiles of the recent samples."""
+        with self._lock:
+            ordered = sorted(self.recent)
+        if not ordered:
+            return [0.0] * len(quantiles)
+        last = len(ordered) - 1
+        return [ordered[min(last, max(0, round(q * len(ordered)) - 1))] for q in quantiles]
+
+
+class Metrics:
+    """Named latency histograms, counters and gauges of one service."""
+
+    enabled = True
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix = prefix
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.collectors: List[Callable[[], None]] = []
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Register a function that updates counters/gauges right before they are reported."""
+        self.collectors.append(collector)
+
+    def collect(self) -> None:
+        for collector in self.collectors:
+            collector()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record the latency of a stage (thread-safe)."""
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, Histogram())
+        histogram.observe(seconds)
+
+    def observe_since(self, stage: str, start: float) -> None:
+        """Record the time since a time.monotonic() timestamp."""
+        self.observe(stage, time.monotonic() - start)
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+
+    def set_counter(self, name: str, value: float) -> None:
+        """Set a counter that is maintained elsewhere (e.g. from a collector)."""
+        self.counters[name] = value
+
+    def summary(self) -> str:
+        """One line with count and p50/p95/p99 (milliseconds) of every stage."""
+        self.collect()
+        parts = []
+        for stage, histogram in sorted(self.histograms.items()):
+            p50, p95, p99 = histogram.quantiles()
+            parts.append(
+                f"{stage}: n={histogram.count} p50={p50 * 1000:.1f} p95={p95 * 1000:.1f} "
+                f"p99={p99 * 1000:.1f} max={histogram.max * 1000:.1f} ms"
+            )
+        parts.extend(f"{name}={value:g}" for name, value in sorted(self.counters.items()))
+        parts.extend(f"{name}={value:g}" for name, value in sorted(self.gauges.items()))
+        return "; ".join(parts) or "no samples"
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        self.collect()
+        name = f"{self.prefix}_latency_seconds"
+        lines = [f"# TYPE {name} histogram"]
+        for stage, histogram in sorted(self.histograms.items()):
+            with histogram._lock:
+                counts = list(histogram.counts)
+                total, count = histogram.sum, histogram.count
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+        quantile_name = f"{self.prefix}_latency_quantile_seconds"
+        lines.append(f"# TYPE {quantile_name} gauge")
+        for stage, histogram in sorted(self.histograms.items()):
+            for quantile, value in zip(QUANTILES, histogram.quantiles()):
+                lines.append(f'{quantile_name}{{stage="{stage}",quantile="{quantile:g}"}} {value:.6f}')
+
+        for counter, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {self.prefix}_{counter}_total counter")
+            lines.append(f"{self.prefix}_{counter}_total {value:g}")
+        for gauge, value in sorted(self.gauges.items()):
+            lines.append(f"# TYPE {self.prefix}_{gauge} gauge")
+            lines.append(f"{self.prefix}_{gauge} {value:g}")
+        lines.append(f"# TYPE {self.prefix}_uptime_seconds gauge")
+        lines.append(f"{self.prefix}_uptime_seconds {time.monotonic() - self.started:.1f}")
+        return "\n".join(lines) + "\n"
+
+
+class NullMetrics:
+    """Stand-in when metrics are disabled: every call does nothing."""
+
+    enabled = False
+
+    def observe(self, stage: str, seconds: float) -> None:
+        pass
+
+    def observe_since(self, stage: str, start: float) -> None:
+        pass
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        pass
+
+    def set_gauge(self, name: str, value: float) -> None:
+        pass
+
+    def set_counter(self, name: str, value: float) -> None:
+        pass
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        pass
+
+    def summary(self) -> str:
+        return "metrics disabled"
+
+
+NULL_METRICS = NullMetrics()
+
+
+async def serve_metrics(metrics: Metrics, port: int, host: str = "127.0.0.1") -> asyncio.AbstractServer:
+    """Serve GET /metrics (any path, really) as Prometheus text on host:port."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            # Request line and headers are not needed, only read up to the blank line
+            while (await reader.readline()).strip():
+                pass
+            body = metrics.render_prometheus().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                b"Connection: close\r\n\r\n" + body
+            )
+            await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def log_summary(metrics: Metrics, interval: float, logger: logging.Logger) -> None:
+    """Log metrics.summary() every interval seconds (run as a task, cancel to stop)."""
+    while True:
+        await asyncio.sleep(interval)
+        logger.info("Metrics: %s", metrics.summary())
+
+
+async def start_reporting(
+    metrics: Metrics, port: Optional[int], interval: Optional[float], logger: logging.Logger
+) -> List[asyncio.Future]:
+    """Start the endpoint and/or summary log; returns what stop_reporting() needs."""
+    handles: List[asyncio.Future] = []
+    if port:
+        server = await serve_metrics(metrics, port)
+        logger.info("Serving metrics on http://127.0.0.1:%s/metrics", port)
+        handles.append(asyncio.ensure_future(server.serve_forever()))
+    if interval:
+        handles.append(asyncio.ensure_future(log_summary(metrics, interval, logger)))
+    return handles
+
+
+async def stop_reporting(handles: List[asyncio.Future]) -> None:
+    for handle in handles:
+        handle.cancel()
+    await asyncio.gather(*handles, return_exceptions=True)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Button monitor and LED service in one process.
+
+On a Pi Zero 2 every Python interpreter costs memory next to wyoming-satellite
+and openWakeWord. This entry point runs s330_buttons.py and
+neopixel_led_service.py on one asyncio event loop:
+
+    python3 voice_mini.py --leds "--uri tcp://127.0.0.1:10500 --num-leds 12" \\
+        --buttons "--audio-control Speaker"
+
+--leds and --buttons take the command lines of the two scripts. Logging
+(--debug, --log-file, --log-buffer, --log-buffer-debug, --log-dump-file) is
+set up once here; the logging options inside --leds/--buttons are ignored. The
+button service gets the satellite state directly from the LED service's event
+handler, so --state-uri is not needed. The separate scripts keep working as before.
+"""
+import argparse
+import asyncio
+import logging
+import shlex
+import signal
+
+import neopixel_led_service as leds
+import s330_buttons as buttons
+import service_logging
+
+_LOGGER = logging.getLogger("voice_mini")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Anker S330 buttons and NeoPixel LEDs in one process")
+    parser.add_argument("--leds", required=True, metavar="ARGS",
+                        help="Arguments of neopixel_led_service.py (at least --uri)")
+    parser.add_argument("--buttons", default="", metavar="ARGS", help="Arguments of s330_buttons.py")
+    parser.add_argument("--debug", action="store_true", help="Log DEBUG messages")
+    parser.add_argument("--log-file", help="Also write the log to this file (in batches, every few seconds)")
+    service_logging.add_arguments(parser)
+    return parser
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Run both services until SIGINT/SIGTERM or until the LED server ends."""
+    led_args = leds.build_parser().parse_args(shlex.split(args.leds))
+    button_args = buttons.build_parser().parse_args(shlex.split(args.buttons))
+    led_args.debug = button_args.debug = args.debug
+
+    # LED event handler -> button service, without the --state-uri socket
+    publisher = leds.StatePublisher()
+    state_mirror = buttons.SatelliteStateMirror(None)
+    publisher.listeners.append(state_mirror.handle_event)
+
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+
+    led_task = asyncio.create_task(leds.run(led_args, publisher), name="leds")
+    button_task = asyncio.create_task(
+        buttons.run_service(button_args, state_mirror=state_mirror, handle_signals=False), name="buttons"
+    )
+    stop_task = asyncio.create_task(stopped.wait(), name="signal")
+    pending = {led_task, button_task, stop_task}
+    try:
+        while led_task in pending and stop_task in pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if button_task in done and not stopped.is_set():
+                # e.g. no S330 found or end of a --replay: the LEDs keep working
+                _LOGGER.warning("Button service stopped, LED service keeps running")
+    finally:
+        tasks = (led_task, button_task, stop_task)
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        if isinstance(results[1], Exception):
+            _LOGGER.error("%s failed: %r", button_task.get_name(), results[1])
+
+    # Without the LED server the combined service is down: fail (non-zero exit status) like
+    # neopixel_led_service.py does, so that systemd's Restart=on-failure applies
+    if isinstance(results[0], Exception):
+        raise results[0]
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    buttons.setup_logging(logging.DEBUG if args.debug else logging.INFO, args.log_file, args.log_buffer,
+                          args.log_dump_file, args.log_buffer_debug)
+    try:
+        asyncio.run(run(args))
+    finally:
+        buttons.log_pipeline.stop()
+
+
+if __name__ == "__main__":
+    main()